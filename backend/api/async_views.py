@@ -0,0 +1,62 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import URLPattern
+from rest_framework.permissions import SAFE_METHODS
+
+ASYNC_READ_ROUTES = (
+    'recipes-list',
+    'recipes-detail',
+    'recipes-feed',
+    'recipes-match',
+    'recipes-popular',
+    'recipes-similar',
+    'tags-list',
+    'tags-detail',
+    'ingredients-list',
+    'ingredients-detail',
+)
+
+
+def run_in_pool(view):
+    """
+    Выполняет view целиком, вместе с запросами к базе и рендерингом ответа,
+    в пуле потоков, а не в единственном потоке для синхронного кода,
+    через который ASGI-обработчик Django 3.2 пропускает все sync-вьюхи.
+    """
+    def render(request, *args, **kwargs):
+        close_old_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            return response
+        finally:
+            close_old_connections()
+    return sync_to_async(render, thread_sensitive=False)
+
+
+def async_read(view):
+    """
+    Асинхронная обёртка DRF-вьюхи: безопасные запросы выполняются
+    параллельно в пуле потоков, остальные — как обычная sync-вьюха.
+    """
+    pooled = run_in_pool(view)
+    serial = sync_to_async(view, thread_sensitive=True)
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await pooled(request, *args, **kwargs)
+        return await serial(request, *args, **kwargs)
+    return async_view
+
+
+def async_read_urls(patterns, routes=ASYNC_READ_ROUTES):
+    return [
+        URLPattern(pattern.pattern, async_read(pattern.callback),
+                   pattern.default_args, pattern.name)
+        if pattern.name in routes else pattern
+        for pattern in patterns
+    ]
@@ -0,0 +1,109 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+from .metrics import TOKEN_CACHE
+
+
+def token_key(key):
+    return f'token:{hashlib.sha1(key.encode()).hexdigest()}'
+
+
+def revoked_key(key):
+    return f'token-revoked:{hashlib.sha1(key.encode()).hexdigest()}'
+
+
+class TokenCache:
+    """
+    id пользователей по токенам: ограниченный LRU в памяти воркера
+    (TOKEN_CACHE_LOCAL_TTL секунд) поверх общего кеша (TOKEN_CACHE_TTL).
+    Сам пользователь в кеш не попадает. Каждая запись помнит, когда её
+    прочитали из базы, а отзыв оставляет в общем кеше метку со временем:
+    записи старше метки не действуют ни в одном воркере.
+    """
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                local = entry[1:]
+            else:
+                local = None
+        if local is not None:
+            revoked = cache.get(revoked_key(key))
+            result = 'local'
+        else:
+            shared = cache.get_many([token_key(key), revoked_key(key)])
+            local = shared.get(token_key(key))
+            revoked = shared.get(revoked_key(key))
+            result = 'shared'
+        if local is None or revoked is not None and revoked >= local[1]:
+            self.forget(key)
+            TOKEN_CACHE.labels('miss').inc()
+            return None
+        TOKEN_CACHE.labels(result).inc()
+        if result == 'shared':
+            self.remember(key, *local)
+        return local[0]
+
+    def set(self, key, user_id, cached_at):
+        cache.set(
+            token_key(key), (user_id, cached_at),
+            timeout=settings.TOKEN_CACHE_TTL
+        )
+        self.remember(key, user_id, cached_at)
+
+    def remember(self, key, user_id, cached_at):
+        with self.lock:
+            self.entries[key] = (
+                time.monotonic() + settings.TOKEN_CACHE_LOCAL_TTL,
+                user_id, cached_at
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def forget(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def evict(self, key):
+        self.forget(key)
+        cache.set(
+            revoked_key(key), time.time(), timeout=settings.TOKEN_CACHE_TTL
+        )
+        cache.delete(token_key(key))
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication, который при попадании в кеш читает только
+    пользователя по первичному ключу, без таблицы токенов.
+    """
+    def authenticate_credentials(self, key):
+        user_id = token_cache.get(key)
+        if user_id is not None:
+            user = get_user_model()._default_manager.filter(
+                pk=user_id, is_active=True
+            ).first()
+            if user is not None:
+                return user, self.get_model()(key=key, user=user)
+            token_cache.forget(key)
+        cached_at = time.time()
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user.pk, cached_at)
+        return user, token
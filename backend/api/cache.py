@@ -0,0 +1,127 @@
+import gzip
+import hashlib
+import time
+
+import brotli
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import F
+
+from recipes.models import Tag
+
+from .models import CacheVersion
+
+INGREDIENTS_VERSION = 'ingredients'
+TAGS_VERSION = 'tags'
+CATALOGUE_TIMEOUT = 60 * 60 * 24
+
+local_catalogues = {}
+local_versions = {}
+
+
+def version_key(name):
+    return f'catalogue-version:{name}'
+
+
+def versions_db():
+    """
+    Алиас основной базы: там хранятся версии, оттуда же читаются строки
+    при пересборке каталога, чтобы отстающая реплика не попала в кеш
+    под новой версией.
+    """
+    return router.db_for_write(CacheVersion)
+
+
+def versions():
+    return CacheVersion.objects.using(versions_db())
+
+
+def get_version(name):
+    """
+    Версия каталога name. Воркер верит своей копии
+    CATALOGUE_VERSION_LOCAL_TTL секунд, потом берёт версию из общего
+    кеша и только при промахе — из основной базы.
+    """
+    now = time.monotonic()
+    local = local_versions.get(name)
+    if local is not None and local[1] > now:
+        return local[0]
+    version = cache.get(version_key(name))
+    if version is None:
+        version = versions().filter(name=name).values_list(
+            'value', flat=True
+        ).first() or 1
+        cache.set(version_key(name), version,
+                  timeout=settings.CATALOGUE_VERSION_TTL)
+    local_versions[name] = (
+        version, now + settings.CATALOGUE_VERSION_LOCAL_TTL
+    )
+    return version
+
+
+def publish_version(name, version):
+    cache.set(version_key(name), version,
+              timeout=settings.CATALOGUE_VERSION_TTL)
+    local_versions.pop(name, None)
+
+
+def bump_version(name):
+    """
+    Увеличивает версию в основной базе и после коммита кладёт её в общий
+    кеш. Запись в кеше живёт CATALOGUE_VERSION_TTL секунд: если две
+    публикации разойдутся, расхождение пропадёт вместе с ней.
+    """
+    queryset = versions()
+    with transaction.atomic(using=queryset.db):
+        if not queryset.filter(name=name).update(value=F('value') + 1):
+            _, created = queryset.get_or_create(
+                name=name, defaults={'value': 2}
+            )
+            if not created:
+                queryset.filter(name=name).update(value=F('value') + 1)
+        version = queryset.filter(name=name).values_list(
+            'value', flat=True
+        ).get()
+        transaction.on_commit(lambda: publish_version(name, version),
+                              using=queryset.db)
+
+
+def get_catalogue(name, build):
+    """
+    Готовый JSON каталога name в вариантах identity, gzip и br вместе
+    со строгим ETag. build() вызывается, только если текущей версии
+    каталога нет ни в памяти воркера, ни в общем кеше.
+    """
+    version = get_version(name)
+    local = local_catalogues.get(name)
+    if local is not None and local[0] == version:
+        return local[1]
+    key = f'catalogue:{name}:v{version}'
+    catalogue = cache.get(key)
+    if catalogue is None:
+        body = build(versions_db())
+        digest = hashlib.sha1(body).hexdigest()[:12]
+        catalogue = {
+            'etag': f'"{name}-{version}-{digest}"',
+            'identity': body,
+            'gzip': gzip.compress(body),
+            'br': brotli.compress(body),
+        }
+        cache.set(key, catalogue, timeout=CATALOGUE_TIMEOUT)
+    local_catalogues[name] = (version, catalogue)
+    return catalogue
+
+
+def get_tag_ids():
+    """
+    Словарь slug → id тегов, перечитывается при смене версии каталога.
+    """
+    version = get_version(TAGS_VERSION)
+    local = local_catalogues.get('tag_ids')
+    if local is None or local[0] != version:
+        local = (version, dict(
+            Tag.objects.using(versions_db()).values_list('slug', 'id')
+        ))
+        local_catalogues['tag_ids'] = local
+    return local[1]
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from recipes.models import Recipe, Timeline
+from users.models import Subscribe
+
+User = get_user_model()
+
+
+def fans_out(author):
+    """Раскладываются ли рецепты автора по лентам подписчиков."""
+    return author.subscribers_count <= settings.FEED_FANOUT_LIMIT
+
+
+def fan_out(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора пакетами."""
+    # Автор запроса может прийти из кеша токенов со старым счётчиком.
+    author = User.objects.only('subscribers_count').get(pk=recipe.author_id)
+    if not fans_out(author):
+        Recipe.objects.filter(pk=recipe.pk).update(fanned_out=False)
+        return
+    followers = Subscribe.objects.filter(
+        author_id=recipe.author_id
+    ).order_by('user_id').values_list('user_id', flat=True)
+    batch = []
+    for user_id in followers.iterator(chunk_size=settings.FEED_BATCH_SIZE):
+        batch.append(Timeline(user_id=user_id, recipe_id=recipe.pk))
+        if len(batch) == settings.FEED_BATCH_SIZE:
+            Timeline.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        Timeline.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill(user, author):
+    """
+    При подписке кладёт в ленту последние разложенные рецепты автора,
+    даже если сейчас его рецепты подмешиваются при чтении: иначе они
+    пропадут из ленты, когда подписчиков у автора станет меньше.
+    """
+    recipe_ids = Recipe.objects.filter(
+        author=author, fanned_out=True
+    ).order_by('-id').values_list('id', flat=True)[
+        :settings.FEED_BACKFILL_SIZE
+    ]
+    Timeline.objects.bulk_create(
+        [Timeline(user=user, recipe_id=recipe_id) for recipe_id in recipe_ids],
+        ignore_conflicts=True
+    )
+
+
+def prune(user, author):
+    """При отписке убирает рецепты автора из ленты."""
+    Timeline.objects.filter(user=user, recipe__author=author).delete()
+
+
+def feed_filter(user):
+    """
+    Рецепты ленты: разложенные при записи, а при чтении — все рецепты
+    авторов с большим числом подписчиков и те, что не раскладывались,
+    потому что автор был таким на момент публикации.
+    """
+    follows = Subscribe.objects.filter(user=user)
+    return Q(id__in=Timeline.objects.filter(user=user).values(
+        'recipe_id'
+    )) | Q(author__in=follows.filter(
+        author__subscribers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).values('author_id')) | Q(
+        fanned_out=False, author__in=follows.values('author_id')
+    )
@@ -0,0 +1,19 @@
+from rest_framework import serializers
+
+from recipes.images import image_urls
+
+
+class RecipeImagesField(serializers.Field):
+    """
+    Адреса уменьшенных копий изображения рецепта в WebP и JPEG.
+    """
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        return image_urls(
+            value.name,
+            request.build_absolute_uri if request is not None else None
+        )
@@ -1,8 +1,12 @@
 import django_filters
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Ingredient, Recipe
+
+from .cache import get_tag_ids
+from .search import search_recipes
 
 User = get_user_model()
 
@@ -18,21 +22,45 @@ class IngredientFilter(django_filters.FilterSet):
         fields = ('name', 'measurement_unit')
 
 
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_ids()]
+
+
 class RecipeFilter(django_filters.FilterSet):
-    tags = django_filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
+    tags = django_filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags'
     )
+    tags_all = filters.BooleanFilter(method='filter_tags_all')
     author = django_filters.ModelChoiceFilter(queryset=User.objects.all())
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('tags', 'tags_all', 'author', 'is_favorited',
+                  'is_in_shopping_cart', 'search')
+
+    def filter_tags(self, queryset, name, value):
+        tag_ids = get_tag_ids()
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk')
+        )
+        if self.form.cleaned_data.get('tags_all'):
+            for slug in value:
+                queryset = queryset.filter(
+                    Exists(recipe_tags.filter(tag_id=tag_ids[slug]))
+                )
+            return queryset
+        return queryset.filter(Exists(recipe_tags.filter(
+            tag_id__in=[tag_ids[slug] for slug in value]
+        )))
+
+    def filter_tags_all(self, queryset, name, value):
+        return queryset
 
     def filter_is_favorited(self, queryset, name, value):
         if value:
@@ -43,3 +71,6 @@ class RecipeFilter(django_filters.FilterSet):
         if value:
             return queryset.filter(cart__user=self.request.user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
@@ -0,0 +1,130 @@
+import json
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmark_baseline.json')
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+class Command(BaseCommand):
+    """
+    Замеряем основные эндпоинты API тестовым клиентом Django
+    """
+    help = 'Benchmark API endpoints and compare with a JSON baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', default=20, type=int)
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument('--update-baseline', action='store_true')
+        parser.add_argument('--tolerance', default=1.25, type=float,
+                            help='Allowed p95 growth over the baseline')
+
+    def scenarios(self):
+        user = (
+            User.objects.annotate(carts=Count('cart'))
+            .order_by('-carts', 'id').first()
+        )
+        if user is None:
+            raise CommandError('База пуста, запустите seed_foodgram')
+        recipe = Recipe.objects.first()
+        tags = list(Tag.objects.values_list('slug', flat=True)[:3])
+        ingredient = Ingredient.objects.order_by('id').first()
+        token, _ = Token.objects.get_or_create(user=user)
+        tag_query = '&'.join(f'tags={slug}' for slug in tags)
+        return token.key, {
+            'recipes-list': '/api/recipes/',
+            'recipes-list-limit-50': '/api/recipes/?limit=50',
+            'recipes-list-deep-page': '/api/recipes/?page=50',
+            'recipes-list-cursor': '/api/recipes/?cursor=',
+            'recipes-list-tags': f'/api/recipes/?{tag_query}',
+            'recipes-list-author': f'/api/recipes/?author={recipe.author_id}',
+            'recipes-list-favorited': '/api/recipes/?is_favorited=1',
+            'recipes-list-in-cart': '/api/recipes/?is_in_shopping_cart=1',
+            'recipes-detail': f'/api/recipes/{recipe.id}/',
+            'users-subscriptions':
+                '/api/users/subscriptions/?recipes_limit=3',
+            'ingredients-search':
+                f'/api/ingredients/?name={ingredient.name[:2]}',
+            'tags-list': '/api/tags/',
+            'download-shopping-cart-txt':
+                '/api/recipes/download_shopping_cart/?format=txt',
+            'download-shopping-cart-pdf':
+                '/api/recipes/download_shopping_cart/?format=pdf',
+        }
+
+    def measure(self, client, url, iterations):
+        timings = []
+        queries = 0
+        # Первый проход прогревает кеши и не учитывается.
+        for _ in range(iterations + 1):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: {response.status_code}')
+            queries = len(context.captured_queries)
+        timings = timings[1:]
+        return {
+            'queries': queries,
+            'p50_ms': round(statistics.median(timings) * 1000, 2),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+        }
+
+    def regressions(self, results, baseline, tolerance):
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                yield (f'{name}: запросов {result["queries"]}, '
+                       f'было {expected["queries"]}')
+            if result['p95_ms'] > expected['p95_ms'] * tolerance:
+                yield (f'{name}: p95 {result["p95_ms"]} мс, '
+                       f'было {expected["p95_ms"]} мс')
+
+    def handle(self, *args, **options):
+        token, scenarios = self.scenarios()
+        client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+        results = {}
+        for name, url in scenarios.items():
+            results[name] = self.measure(client, url, options['iterations'])
+            self.stdout.write(
+                f'{name:32} {results[name]["queries"]:4} запросов  '
+                f'p50 {results[name]["p50_ms"]:8} мс  '
+                f'p95 {results[name]["p95_ms"]:8} мс'
+            )
+        path = options['baseline']
+        if options['update_baseline'] or not os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Базовая линия: {path}'))
+            return
+        with open(path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = list(
+            self.regressions(results, baseline, options['tolerance'])
+        )
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,142 @@
+import asyncio
+import importlib
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+from rest_framework.authtoken.models import Token
+
+from api.streaming import StreamingASGIHandler
+from recipes.models import Ingredient, Recipe
+
+from .benchmark_api import percentile
+
+
+def use_async_reads(enabled):
+    """
+    Пересобирает URL-конфигурацию с асинхронными обёртками или без них.
+    """
+    with override_settings(ASYNC_READS=enabled):
+        importlib.reload(importlib.import_module('api.urls'))
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+async def call(application, url, token):
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': parts.path,
+        'query_string': parts.query.encode(),
+        'root_path': '',
+        'headers': [(b'authorization', f'Token {token}'.encode())],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return (messages[0]['status'],
+            b''.join(message.get('body', b'') for message in messages[1:]))
+
+
+async def load(application, url, token, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                return await call(application, url, token)
+            finally:
+                timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(requests)))
+    return results, timings, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    """
+    Сравниваем синхронные и асинхронные вьюхи чтения под параллельной
+    нагрузкой через ASGI-обработчик Django
+    """
+    help = 'Compare sync and async read endpoints under concurrent ASGI load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', default=200, type=int)
+        parser.add_argument('--concurrency', default=50, type=int)
+
+    def scenarios(self):
+        recipe = Recipe.objects.first()
+        ingredient = Ingredient.objects.order_by('id').first()
+        if recipe is None or ingredient is None:
+            raise CommandError('База пуста, запустите seed_foodgram')
+        token, _ = Token.objects.get_or_create(user=recipe.author)
+        return token.key, {
+            'recipes-list': '/api/recipes/',
+            'recipes-list-limit-50': '/api/recipes/?limit=50',
+            'recipes-detail': f'/api/recipes/{recipe.id}/',
+            'tags-list': '/api/tags/',
+            'ingredients-search':
+                f'/api/ingredients/?name={ingredient.name[:2]}',
+            'ingredients-detail': f'/api/ingredients/{ingredient.id}/',
+        }
+
+    def measure(self, application, url, token, options):
+        # Первый запрос прогревает кеши и не учитывается.
+        asyncio.run(call(application, url, token))
+        results, timings, elapsed = asyncio.run(load(
+            application, url, token,
+            options['requests'], options['concurrency']
+        ))
+        statuses = {status for status, _ in results}
+        if statuses != {200}:
+            raise CommandError(f'{url}: {sorted(statuses)}')
+        return results[0][1], {
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(statistics.median(timings) * 1000, 2),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+        }
+
+    def handle(self, *args, **options):
+        token, scenarios = self.scenarios()
+        application = StreamingASGIHandler()
+        mismatches = []
+        try:
+            for name, url in scenarios.items():
+                bodies = {}
+                for mode in ('sync', 'async'):
+                    use_async_reads(mode == 'async')
+                    bodies[mode], result = self.measure(
+                        application, url, token, options
+                    )
+                    self.stdout.write(
+                        f'{name:24} {mode:5}  {result["rps"]:8} зап/с  '
+                        f'p50 {result["p50_ms"]:8} мс  '
+                        f'p95 {result["p95_ms"]:8} мс'
+                    )
+                if bodies['sync'] != bodies['async']:
+                    mismatches.append(name)
+        finally:
+            use_async_reads(settings.ASYNC_READS)
+        if mismatches:
+            raise CommandError(
+                'Ответы sync и async различаются: ' + ', '.join(mismatches)
+            )
+        self.stdout.write(self.style.SUCCESS('Ответы sync и async совпадают'))
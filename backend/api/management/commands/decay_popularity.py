@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from api.popularity import decayed_scores
+from recipes.models import Recipe
+
+
+def chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Command(BaseCommand):
+    """
+    Пересчитываем затухающую популярность рецептов по датам добавления
+    в избранное и списки покупок; запускается по расписанию
+    """
+    help = 'Recompute time-decayed recipe popularity scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', default=1000, type=int)
+
+    def handle(self, *args, **options):
+        scores = decayed_scores()
+        batch_size = options['batch_size']
+        for batch in chunks(scores.items(), batch_size):
+            Recipe.objects.bulk_update(
+                [Recipe(pk=pk, popularity=score) for pk, score in batch],
+                ['popularity']
+            )
+        faded = set(
+            Recipe.objects.filter(popularity__gt=0)
+            .values_list('pk', flat=True)
+        ) - scores.keys()
+        for batch in chunks(faded, batch_size):
+            Recipe.objects.filter(pk__in=batch).update(popularity=0)
+        self.stdout.write(self.style.SUCCESS(
+            f'Популярность пересчитана: {len(scores)} рецептов, '
+            f'обнулено {len(faded)}'
+        ))
@@ -1,36 +1,39 @@
-import csv
-import os
-
-from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
+from api.cache import INGREDIENTS_VERSION, bump_version
+from api.management.loader import bulk_load, read_records
 from recipes.models import Ingredient
 
-DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
-
 
 class Command(BaseCommand):
     """
-    Добавляем ингредиенты из файла CSV
+    Добавляем ингредиенты из файла CSV или JSON
     """
     help = 'Loading ingredients from data in json or csv'
 
     def add_arguments(self, parser):
         parser.add_argument('filename', default='ingredients.csv', nargs='?',
                             type=str)
+        parser.add_argument('--chunk-size', default=1000, type=int)
+
+    def progress(self, processed):
+        self.stdout.write(f'Обработано строк: {processed}')
 
     def handle(self, *args, **options):
         try:
-            with open(os.path.join(DATA_ROOT, options['filename']), 'r',
-                      encoding='utf-8') as f:
-                data = csv.reader(f)
-                for row in data:
-                    name, measurement_unit = row
-                    Ingredient.objects.get_or_create(
-                        name=name,
-                        measurement_unit=measurement_unit
-                    )
+            created, skipped = bulk_load(
+                Ingredient,
+                ['name', 'measurement_unit'],
+                read_records(options['filename'],
+                             ['name', 'measurement_unit']),
+                chunk_size=options['chunk_size'],
+                progress=self.progress
+            )
         except FileNotFoundError:
             raise CommandError(
                 'Добавьте файл ingredients.csv в директорию data'
             )
+        bump_version(INGREDIENTS_VERSION)
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено ингредиентов: {created}, пропущено: {skipped}'
+        ))
@@ -0,0 +1,34 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from recipes.images import (get_executor, image_targets, is_processed,
+                            resize_image)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Нарезаем уменьшенные копии изображений рецептов, которых ещё нет
+    """
+    help = 'Generate missing recipe image sizes'
+
+    def handle(self, *args, **options):
+        names = [
+            name for name in Recipe.objects.values_list('image', flat=True)
+            .iterator() if name and not is_processed(name)
+        ]
+        executor = get_executor()
+        futures = {
+            name: executor.submit(resize_image, default_storage.path(name),
+                                  image_targets(name))
+            for name in names
+        }
+        failed = 0
+        for name, future in futures.items():
+            if future.exception() is not None:
+                failed += 1
+                self.stderr.write(f'{name}: {future.exception()}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {len(names) - failed}, '
+            f'с ошибками: {failed}'
+        ))
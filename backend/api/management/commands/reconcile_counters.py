@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe
+from users.models import Subscribe
+
+User = get_user_model()
+
+# Модель, счётчик, модель со строками и её внешний ключ на первую модель.
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscribe, 'author'),
+)
+
+
+def live_count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def batches(queryset, batch_size):
+    batch = []
+    for pk in queryset.order_by('pk').values_list('pk', flat=True).iterator():
+        batch.append(pk)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    """
+    Сверяем счётчики избранного, рецептов и подписчиков с таблицами
+    и исправляем расхождения пакетами
+    """
+    help = 'Verify and repair denormalised counters in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only verify counters, do not repair them')
+        parser.add_argument('--batch-size', default=1000, type=int)
+
+    def reconcile(self, model, field, related, related_field, options):
+        drifted = 0
+        live = live_count(related, related_field)
+        for pks in batches(model.objects.all(), options['batch_size']):
+            stale = list(
+                model.objects.filter(pk__in=pks).annotate(live=live)
+                .exclude(**{field: F('live')}).values_list('pk', flat=True)
+            )
+            drifted += len(stale)
+            if stale and not options['check']:
+                model.objects.filter(pk__in=stale).update(**{field: live})
+        return drifted
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, field, related, related_field in COUNTERS:
+            drifted = self.reconcile(
+                model, field, related, related_field, options
+            )
+            total += drifted
+            self.stdout.write(
+                f'{model._meta.model_name}.{field}: расхождений {drifted}'
+            )
+        if total and options['check']:
+            raise CommandError(f'Счётчики расходятся: {total} строк')
+        self.stdout.write(self.style.SUCCESS('Счётчики сверены'))
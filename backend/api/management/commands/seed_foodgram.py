@@ -0,0 +1,192 @@
+import io
+import random
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from api.cache import INGREDIENTS_VERSION, TAGS_VERSION, bump_version
+from api.pantry import log_rebuild
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            Shopping, Tag)
+from users.models import Subscribe
+
+User = get_user_model()
+
+SEED_IMAGE = 'recipe_img/seed.png'
+UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'по вкусу')
+
+
+def zipf_weights(size, alpha=1.1):
+    """
+    Накопленные веса распределения Ципфа: первые элементы выбираются
+    намного чаще последних, как популярные рецепты и авторы.
+    """
+    return list(accumulate(1 / (rank ** alpha) for rank in
+                           range(1, size + 1)))
+
+
+class Command(BaseCommand):
+    """
+    Заполняем базу синтетическими данными для нагрузочных замеров
+    """
+    help = 'Generate deterministic synthetic users, recipes and relations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', default=1000, type=int)
+        parser.add_argument('--recipes', default=5000, type=int)
+        parser.add_argument('--tags', default=10, type=int)
+        parser.add_argument('--ingredients', default=500, type=int,
+                            help='Generated only if the catalogue is empty')
+        parser.add_argument('--favorites', default=20000, type=int)
+        parser.add_argument('--carts', default=5000, type=int)
+        parser.add_argument('--subscriptions', default=10000, type=int)
+        parser.add_argument('--seed', default=42, type=int)
+        parser.add_argument('--batch-size', default=1000, type=int)
+
+    def bulk(self, model, objs):
+        model.objects.bulk_create(objs, batch_size=self.batch_size,
+                                  ignore_conflicts=True)
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {len(objs)}')
+
+    def pairs(self, count, first, second, second_weights):
+        """
+        count уникальных пар (first, second), second выбирается по весам.
+        """
+        result = set()
+        for _ in range(count * 3):
+            if len(result) >= count:
+                break
+            result.add((
+                self.rng.choice(first),
+                self.rng.choices(second, cum_weights=second_weights)[0]
+            ))
+        return sorted(result)
+
+    def create_users(self, count):
+        password = make_password('password')
+        self.bulk(User, [
+            User(
+                username=f'{self.prefix}_user_{number}',
+                email=f'{self.prefix}_user_{number}@example.com',
+                first_name=f'Имя {number}',
+                last_name=f'Фамилия {number}',
+                password=password
+            ) for number in range(count)
+        ])
+        return list(
+            User.objects.filter(username__startswith=f'{self.prefix}_user_')
+            .order_by('id').values_list('id', flat=True)
+        )
+
+    def create_tags(self, count):
+        self.bulk(Tag, [
+            Tag(
+                name=f'{self.prefix} тег {number}',
+                color=f'#{self.rng.randrange(16 ** 6):06X}',
+                slug=f'{self.prefix}-tag-{number}'
+            ) for number in range(count)
+        ])
+        bump_version(TAGS_VERSION)
+        return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+    def create_ingredients(self, count):
+        if not Ingredient.objects.exists():
+            self.bulk(Ingredient, [
+                Ingredient(name=f'ингредиент {number}',
+                           measurement_unit=self.rng.choice(UNITS))
+                for number in range(count)
+            ])
+            bump_version(INGREDIENTS_VERSION)
+        return list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+
+    def seed_image(self):
+        if not default_storage.exists(SEED_IMAGE):
+            buffer = io.BytesIO()
+            Image.new('RGB', (480, 480), '#FFB347').save(buffer, 'PNG')
+            default_storage.save(SEED_IMAGE, ContentFile(buffer.getvalue()))
+        return SEED_IMAGE
+
+    def create_recipes(self, count, author_ids):
+        image = self.seed_image()
+        author_weights = zipf_weights(len(author_ids))
+        authors = self.rng.choices(author_ids, cum_weights=author_weights,
+                                   k=count)
+        self.bulk(Recipe, [
+            Recipe(
+                author_id=author_id,
+                name=f'{self.prefix} рецепт {number}',
+                text=f'Описание рецепта {number}. ' * self.rng.randint(1, 20),
+                cooking_time=self.rng.randint(5, 180),
+                image=image
+            ) for number, author_id in enumerate(authors)
+        ])
+        return list(
+            Recipe.objects.filter(name__startswith=f'{self.prefix} рецепт ')
+            .order_by('-id').values_list('id', flat=True)
+        )
+
+    def create_relations(self, recipe_ids, tag_ids, ingredient_ids):
+        ingredient_weights = zipf_weights(len(ingredient_ids), alpha=0.8)
+        recipe_ingredients = []
+        recipe_tags = []
+        for recipe_id in recipe_ids:
+            chosen = set(self.rng.choices(
+                ingredient_ids, cum_weights=ingredient_weights,
+                k=self.rng.randint(2, 15)
+            ))
+            recipe_ingredients.extend(
+                RecipeIngredient(recipe_id=recipe_id, ingredient_id=pk,
+                                 amount=self.rng.randint(1, 500))
+                for pk in chosen
+            )
+            recipe_tags.extend(
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=pk)
+                for pk in self.rng.sample(
+                    tag_ids, min(len(tag_ids), self.rng.randint(1, 3))
+                )
+            )
+        self.bulk(RecipeIngredient, recipe_ingredients)
+        self.bulk(Recipe.tags.through, recipe_tags)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.prefix = f'seed{options["seed"]}'
+        self.batch_size = options['batch_size']
+        user_ids = self.create_users(options['users'])
+        tag_ids = self.create_tags(options['tags'])
+        ingredient_ids = self.create_ingredients(options['ingredients'])
+        recipe_ids = self.create_recipes(options['recipes'], user_ids)
+        self.create_relations(recipe_ids, tag_ids, ingredient_ids)
+        log_rebuild()
+        # Самые новые рецепты и первые пользователи — самые популярные.
+        recipe_weights = zipf_weights(len(recipe_ids))
+        user_weights = zipf_weights(len(user_ids))
+        self.bulk(Favorite, [
+            Favorite(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in self.pairs(
+                options['favorites'], user_ids, recipe_ids, recipe_weights
+            )
+        ])
+        self.bulk(Shopping, [
+            Shopping(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in self.pairs(
+                options['carts'], user_ids, recipe_ids, recipe_weights
+            )
+        ])
+        self.bulk(Subscribe, [
+            Subscribe(user_id=user_id, author_id=author_id)
+            for user_id, author_id in self.pairs(
+                options['subscriptions'], user_ids, user_ids, user_weights
+            ) if user_id != author_id
+        ])
+        call_command('shopping_totals', stdout=self.stdout)
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('decay_popularity', stdout=self.stdout)
@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import RecipeIngredient, Shopping, ShoppingIngredient
+
+
+class Command(BaseCommand):
+    """
+    Пересобираем сводные списки покупок и сверяем их с корзинами
+    """
+    help = 'Rebuild and verify per-user shopping list totals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only verify totals, do not rebuild them')
+        parser.add_argument('--batch-size', default=500, type=int)
+
+    def live_totals(self, user_ids):
+        return {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in (
+                RecipeIngredient.objects
+                .filter(recipe__cart__user_id__in=user_ids)
+                .values_list('recipe__cart__user_id', 'ingredient_id')
+                .annotate(amount_total=Sum('amount'))
+                .order_by()
+            )
+        }
+
+    def stored_totals(self, user_ids):
+        return {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in (
+                ShoppingIngredient.objects
+                .filter(user_id__in=user_ids)
+                .values_list('user_id', 'ingredient_id', 'total_amount')
+            )
+        }
+
+    @transaction.atomic
+    def rebuild(self, user_ids, totals):
+        ShoppingIngredient.objects.filter(user_id__in=user_ids).delete()
+        ShoppingIngredient.objects.bulk_create(
+            ShoppingIngredient(user_id=user_id, ingredient_id=ingredient_id,
+                               total_amount=amount)
+            for (user_id, ingredient_id), amount in totals.items()
+        )
+
+    def user_batches(self, batch_size):
+        user_ids = (
+            Shopping.objects.values_list('user_id', flat=True)
+            .union(ShoppingIngredient.objects.values_list('user_id',
+                                                          flat=True))
+            .order_by('user_id')
+        )
+        batch = []
+        for user_id in user_ids.iterator():
+            batch.append(user_id)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def handle(self, *args, **options):
+        mismatches = 0
+        for user_ids in self.user_batches(options['batch_size']):
+            live = self.live_totals(user_ids)
+            if not options['check']:
+                self.rebuild(user_ids, live)
+            if self.stored_totals(user_ids) != live:
+                mismatches += 1
+                self.stderr.write(
+                    f'Расхождение в списках покупок пользователей '
+                    f'{user_ids[0]}-{user_ids[-1]}'
+                )
+        if mismatches:
+            raise CommandError(
+                f'Сводные списки покупок расходятся с корзинами: '
+                f'{mismatches} пакетов'
+            )
+        self.stdout.write(self.style.SUCCESS('Сводные списки покупок верны'))
@@ -0,0 +1,76 @@
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from scipy import sparse
+
+from api.similarity import (affected_rows, block_scores, feature_matrix,
+                            top_neighbours)
+from recipes.models import Recipe, SimilarRecipe
+
+
+class Command(BaseCommand):
+    """
+    Подбираем похожие рецепты по общим ингредиентам и тегам: косинусное
+    сходство считается блоками строк, чтобы память не росла с числом
+    рецептов. Без --full пересчитываются только рецепты, изменённые
+    после прошлого запуска, и те, чьи списки соседей это затрагивает
+    """
+    help = 'Rebuild similar recipes from ingredient and tag overlap'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Recompute neighbours of every recipe')
+        parser.add_argument('--block-size', default=256, type=int)
+        parser.add_argument('--count', default=settings.SIMILAR_RECIPES_COUNT,
+                            type=int, help='Neighbours kept per recipe')
+
+    def save_block(self, recipe_ids, rows, scores, count, started):
+        block_ids = recipe_ids[rows].tolist()
+        similar = [
+            SimilarRecipe(recipe_id=recipe_id, similar_id=int(similar_id),
+                          score=float(score))
+            for recipe_id, (cols, values) in zip(
+                block_ids, top_neighbours(scores, count)
+            )
+            for similar_id, score in zip(recipe_ids[cols], values)
+        ]
+        with transaction.atomic():
+            SimilarRecipe.objects.filter(recipe_id__in=block_ids).delete()
+            SimilarRecipe.objects.bulk_create(similar)
+            Recipe.objects.filter(pk__in=block_ids).update(
+                similar_updated=started
+            )
+        return len(similar)
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        block_size = options['block_size']
+        changed_ids = np.fromiter(
+            Recipe.objects.filter(
+                Q(similar_updated__isnull=True)
+                | Q(updated__gt=F('similar_updated'))
+            ).values_list('pk', flat=True).iterator(),
+            dtype=np.int64
+        )
+        recipe_ids, matrix = feature_matrix()
+        matrix_t = sparse.csr_matrix(matrix.T)
+        if options['full']:
+            rows = np.arange(len(recipe_ids))
+        else:
+            changed = np.flatnonzero(np.isin(recipe_ids, changed_ids))
+            rows = affected_rows(recipe_ids, matrix, matrix_t, changed,
+                                 options['count'], block_size)
+        saved = 0
+        for start in range(0, len(rows), block_size):
+            block = rows[start:start + block_size]
+            saved += self.save_block(
+                recipe_ids, block, block_scores(matrix, matrix_t, block),
+                options['count'], started
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Похожие рецепты подобраны: {len(rows)} рецептов, '
+            f'{saved} связей'
+        ))
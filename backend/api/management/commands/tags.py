@@ -1,17 +1,13 @@
-import csv
-import os
-
-from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
+from api.cache import TAGS_VERSION, bump_version
+from api.management.loader import bulk_load, read_records
 from recipes.models import Tag
 
-DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
-
 
 class Command(BaseCommand):
     """
-    Добавляем тэги из файла CSV
+    Добавляем тэги из файла CSV или JSON
     """
     def add_arguments(self, parser):
         parser.add_argument('filename', default='tags.csv', nargs='?',
@@ -19,14 +15,15 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         try:
-            with open(os.path.join(DATA_ROOT, options['filename']), 'r',
-                      encoding='utf-8') as f:
-                datareader = csv.reader(f)
-                for row in datareader:
-                    Tag.objects.get_or_create(
-                        name=row[0],
-                        color=row[1],
-                        slug=row[2]
-                    )
+            created, skipped = bulk_load(
+                Tag,
+                ['name', 'color', 'slug'],
+                read_records(options['filename'], ['name', 'color', 'slug']),
+                key_fields=['slug']
+            )
         except FileNotFoundError:
             raise CommandError('Добавьте файл tags.csv в директорию data')
+        bump_version(TAGS_VERSION)
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено тегов: {created}, пропущено: {skipped}'
+        ))
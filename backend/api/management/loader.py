@@ -0,0 +1,55 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
+
+
+def read_records(filename, fields):
+    """
+    Читаем записи из CSV (поля по порядку) или JSON (список объектов).
+    """
+    path = os.path.join(DATA_ROOT, filename)
+    with open(path, 'r', encoding='utf-8') as f:
+        if os.path.splitext(path)[1].lower() == '.json':
+            for item in json.load(f):
+                yield tuple(str(item[field]).strip() for field in fields)
+            return
+        for row in csv.reader(f):
+            if row:
+                yield tuple(value.strip() for value in row[:len(fields)])
+
+
+def bulk_load(model, fields, records, key_fields=None, chunk_size=1000,
+              progress=None):
+    """
+    Загружаем записи пачками через bulk_create, пропуская повторы в файле
+    и уже существующие в базе строки. Возвращает (добавлено, пропущено).
+    """
+    key_indexes = [fields.index(field) for field in key_fields or fields]
+    seen = set()
+    processed = 0
+    before = model.objects.count()
+    records = iter(records)
+    with transaction.atomic():
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            objs = []
+            for record in chunk:
+                key = tuple(record[index] for index in key_indexes)
+                if key in seen:
+                    continue
+                seen.add(key)
+                objs.append(model(**dict(zip(fields, record))))
+            model.objects.bulk_create(objs, ignore_conflicts=True)
+            processed += len(chunk)
+            if progress:
+                progress(processed)
+    created = model.objects.count() - before
+    return created, processed - created
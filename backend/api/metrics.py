@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_latency_seconds',
+    'Время обработки запроса',
+    ['route', 'method', 'status'],
+)
+SQL_QUERIES = Histogram(
+    'foodgram_sql_queries',
+    'Количество SQL-запросов на один запрос к API',
+    ['route', 'method'],
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, float('inf')),
+)
+SQL_TIME = Histogram(
+    'foodgram_sql_seconds',
+    'Суммарное время SQL-запросов на один запрос к API',
+    ['route', 'method'],
+)
+TOKEN_CACHE = Counter(
+    'foodgram_token_cache',
+    'Поиск токенов в кеше: local, shared — попадания, miss — промахи',
+    ['result'],
+)
+
+
+class QueryStats:
+    """
+    Обёртка execute для connection.execute_wrapper: считает запросы
+    и время, проведённое в базе.
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+query_stats = ContextVar('query_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Обёртка execute, которая стоит на каждом соединении: запрос попадает
+    в QueryStats текущего запроса к API, в каком бы потоке ни выполнялась
+    вьюха — sync_to_async переносит контекст в поток вместе с query_stats.
+    """
+    stats = query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_stats(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.acall(request)
+        stats = QueryStats()
+        start = time.perf_counter()
+        token = query_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            query_stats.reset(token)
+        return self.observe(request, response, stats, start)
+
+    async def acall(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        token = query_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            query_stats.reset(token)
+        return self.observe(request, response, stats, start)
+
+    def observe(self, request, response, stats, start):
+        match = request.resolver_match
+        route = match.url_name if match and match.url_name else 'unresolved'
+        if route != 'metrics':
+            REQUEST_LATENCY.labels(
+                route, request.method, response.status_code
+            ).observe(time.perf_counter() - start)
+            SQL_QUERIES.labels(route, request.method).observe(stats.count)
+            SQL_TIME.labels(route, request.method).observe(stats.duration)
+        return response
+
+
+def metrics(request):
+    registry = REGISTRY
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry),
+                        content_type=CONTENT_TYPE_LATEST)
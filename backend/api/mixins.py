@@ -1,7 +1,52 @@
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 from rest_framework import mixins, viewsets
+from rest_framework.renderers import JSONRenderer
+
+from .cache import get_catalogue
+
+CATALOGUE_ENCODINGS = ('br', 'gzip')
 
 
 class ListRetrieveViewSet(mixins.RetrieveModelMixin,
                           mixins.ListModelMixin,
                           viewsets.GenericViewSet):
     pass
+
+
+class CatalogueCacheMixin:
+    """
+    Отдаёт список без параметров из кеша каталога catalogue_version
+    и отвечает 304 на If-None-Match с актуальным ETag.
+    """
+    catalogue_version = None
+
+    def build_catalogue(self, using):
+        queryset = self.filter_queryset(self.get_queryset()).using(using)
+        serializer = self.get_serializer(queryset, many=True)
+        return JSONRenderer().render(serializer.data)
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        catalogue = get_catalogue(self.catalogue_version,
+                                  self.build_catalogue)
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if catalogue['etag'] in etags or '*' in etags:
+            response = HttpResponseNotModified()
+        else:
+            accepted = {
+                encoding.split(';')[0].strip() for encoding
+                in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+            }
+            encoding = next(
+                (item for item in CATALOGUE_ENCODINGS if item in accepted),
+                'identity'
+            )
+            response = HttpResponse(catalogue[encoding],
+                                    content_type='application/json')
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = catalogue['etag']
+        response['Vary'] = 'Accept-Encoding'
+        return response
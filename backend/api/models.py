@@ -0,0 +1,33 @@
+from django.db import models
+
+
+class CacheVersion(models.Model):
+    """
+    Версия кешируемых данных: меняется только через F(), поэтому общий
+    для всех воркеров счётчик не теряет приращений и не сбрасывается.
+    """
+    name = models.CharField('Название', max_length=50, primary_key=True)
+    value = models.BigIntegerField('Версия', default=1)
+
+    class Meta:
+        verbose_name = 'Версия кеша'
+        verbose_name_plural = 'Версии кеша'
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
+
+
+class PantryChange(models.Model):
+    """
+    Журнал изменений ингредиентов и тегов рецептов для индексов подбора
+    по продуктам в воркерах. Пустой recipe_id — перестроить индекс целиком.
+    """
+    recipe_id = models.BigIntegerField('Рецепт', null=True)
+    created = models.DateTimeField('Дата', auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Изменение рецепта'
+        verbose_name_plural = 'Изменения рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id} в {self.created}'
@@ -1,7 +1,76 @@
 from django.conf import settings
-from rest_framework.pagination import PageNumberPagination
+from django.core.paginator import Paginator
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class FilteredCountPaginator(Paginator):
+    """
+    Считает строки по отфильтрованному queryset без аннотаций и
+    сортировки: иначе Django оборачивает COUNT(*) в подзапрос и вычисляет
+    коррелированные Exists и ранг поиска для каждой подходящей строки.
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet) or any(
+            annotation.contains_aggregate
+            for annotation in queryset.query.annotations.values()
+        ):
+            return super().count
+        queryset = queryset.order_by()
+        queryset.query.annotations = {}
+        queryset.query.set_annotation_mask(None)
+        return queryset.count()
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Постраничный вывод по ключу: курсор хранит последний показанный id,
+    поэтому не нужны ни COUNT(*), ни OFFSET.
+    """
+    page_size = settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    ordering = '-id'
+
+
+class ListPageNumberPagination(PageNumberPagination):
+    """
+    Постраничный вывод заранее упорядоченного списка, а не queryset.
+    """
+    page_size = settings.PAGE_SIZE
+    page_size_query_param = 'limit'
 
 
 class CustomPageNumberPagination(PageNumberPagination):
+    """
+    Постраничный вывод по номеру страницы или, с параметром cursor,
+    по ключу. Курсор держит порядок по id, поэтому при поиске, где
+    порядок задаёт релевантность, остаётся вывод по номеру страницы.
+    """
+    django_paginator_class = FilteredCountPaginator
     page_size = settings.PAGE_SIZE
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    ranked_query_params = ('search',)
+    cursor_paginator = None
+
+    def use_cursor(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params and not any(
+            params.get(param) for param in self.ranked_query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = IdCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,200 @@
+import threading
+from datetime import timedelta
+from functools import reduce
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from recipes.models import Recipe, RecipeIngredient
+
+from .models import PantryChange
+
+# Сколько хранится журнал и сколько секунд запись может быть не видна
+# читателям после выдачи ей id (транзакция ещё не закоммичена).
+CHANGE_RETENTION = timedelta(days=1)
+CHANGE_SETTLE = timedelta(seconds=60)
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+def log_changes(recipe_ids):
+    """
+    Записывает в журнал, что у рецептов recipe_ids поменялись
+    ингредиенты или теги: воркеры обновят только эти рецепты.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    PantryChange.objects.bulk_create(
+        [PantryChange(recipe_id=recipe_id) for recipe_id in recipe_ids]
+    )
+    PantryChange.objects.filter(
+        created__lt=timezone.now() - CHANGE_RETENTION
+    ).delete()
+
+
+def log_rebuild():
+    """Просит все воркеры перестроить индекс целиком."""
+    log_changes([None])
+
+
+def postings(pairs):
+    """
+    Из пар (рецепт, признак) — словарь признак → отсортированный массив
+    id рецептов и словарь рецепт → кортеж его признаков.
+    """
+    pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+    pairs = pairs[np.lexsort((pairs[:, 0], pairs[:, 1]))]
+    keys, starts = np.unique(pairs[:, 1], return_index=True)
+    index = dict(zip(keys.tolist(), np.split(pairs[:, 0], starts[1:])))
+    forward = {}
+    for recipe_id, key in pairs.tolist():
+        forward.setdefault(recipe_id, []).append(key)
+    return index, {key: tuple(value) for key, value in forward.items()}
+
+
+def insert(array, value):
+    position = np.searchsorted(array, value)
+    if position < len(array) and array[position] == value:
+        return array
+    return np.insert(array, position, value)
+
+
+def remove(array, value):
+    position = np.searchsorted(array, value)
+    if position < len(array) and array[position] == value:
+        return np.delete(array, position)
+    return array
+
+
+class PantryIndex:
+    """
+    Инвертированный индекс в памяти воркера: ингредиент (и тег) →
+    отсортированный массив id рецептов. Изменённые рецепты подтягиваются
+    по журналу PantryChange: записи с id не больше floor уже учтены,
+    более новые, уже применённые, лежат в seen.
+    """
+    def __init__(self):
+        self.floor = None
+        self.seen = set()
+        self.refreshed = None
+        self.ingredients = {}
+        self.recipe_ingredients = {}
+        self.tags = {}
+        self.recipe_tags = {}
+        self.sizes = EMPTY
+        self.lock = threading.RLock()
+
+    def rebuild(self):
+        self.ingredients, self.recipe_ingredients = postings(list(
+            RecipeIngredient.objects
+            .values_list('recipe_id', 'ingredient_id').iterator()
+        ))
+        self.tags, self.recipe_tags = postings(list(
+            Recipe.tags.through.objects
+            .values_list('recipe_id', 'tag_id').iterator()
+        ))
+        self.sizes = np.zeros(
+            max(self.recipe_ingredients, default=0) + 1, dtype=np.int64
+        )
+        for recipe_id, keys in self.recipe_ingredients.items():
+            self.sizes[recipe_id] = len(keys)
+
+    def resize(self, recipe_id):
+        if recipe_id >= len(self.sizes):
+            self.sizes = np.concatenate([
+                self.sizes,
+                np.zeros(recipe_id + 1 - len(self.sizes), dtype=np.int64)
+            ])
+        return self.sizes
+
+    def move(self, index, forward, recipe_id, keys):
+        for key in forward.pop(recipe_id, ()):
+            index[key] = remove(index[key], recipe_id)
+        for key in keys:
+            index[key] = insert(index.get(key, EMPTY), recipe_id)
+        if keys:
+            forward[recipe_id] = tuple(keys)
+
+    def apply(self, recipe_ids):
+        ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+        for recipe_id, key in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            ingredients[recipe_id].append(key)
+        tags = {recipe_id: [] for recipe_id in recipe_ids}
+        for recipe_id, key in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'tag_id'):
+            tags[recipe_id].append(key)
+        for recipe_id in recipe_ids:
+            self.move(self.ingredients, self.recipe_ingredients, recipe_id,
+                      sorted(ingredients[recipe_id]))
+            self.resize(recipe_id)[recipe_id] = len(ingredients[recipe_id])
+            self.move(self.tags, self.recipe_tags, recipe_id,
+                      sorted(tags[recipe_id]))
+
+    def changes(self, floor, limit=None):
+        return list(
+            PantryChange.objects.filter(id__gt=floor).order_by('id')
+            .values_list('id', 'recipe_id', 'created')[:limit]
+        )
+
+    def refresh(self):
+        now = timezone.now()
+        settled = now - CHANGE_SETTLE
+        with self.lock:
+            changes = None
+            if (self.floor is not None
+                    and self.refreshed >= now - CHANGE_RETENTION):
+                changes = self.changes(
+                    self.floor, settings.PANTRY_MAX_CHANGES + 1
+                )
+                fresh = [change for change in changes
+                         if change[0] not in self.seen]
+                if (len(changes) > settings.PANTRY_MAX_CHANGES
+                        or any(change[1] is None for change in fresh)):
+                    changes = None
+            if changes is None:
+                self.floor = PantryChange.objects.filter(
+                    created__lt=settled
+                ).order_by('-created').values_list('id', flat=True).first()
+                self.floor = self.floor or 0
+                changes = self.changes(self.floor)
+                self.rebuild()
+            else:
+                if fresh:
+                    self.apply(sorted({change[1] for change in fresh}))
+                self.floor = max(
+                    (pk for pk, _, created in changes if created < settled),
+                    default=self.floor
+                )
+            self.seen = {pk for pk, _, _ in changes if pk > self.floor}
+            self.refreshed = now
+
+    def match(self, ingredient_ids, tag_ids=(), all_tags=False):
+        """
+        Рецепты, в которых есть хотя бы один из ingredient_ids, и число
+        недостающих ингредиентов: сначала те, где не хватает меньше всего.
+        """
+        self.refresh()
+        with self.lock:
+            lists = [self.ingredients.get(key, EMPTY)
+                     for key in ingredient_ids]
+            tag_lists = [self.tags.get(key, EMPTY) for key in tag_ids]
+            candidates, matched = np.unique(
+                np.concatenate(lists or [EMPTY]), return_counts=True
+            )
+            if tag_lists:
+                allowed = (
+                    reduce(np.intersect1d, tag_lists) if all_tags
+                    else np.unique(np.concatenate(tag_lists))
+                )
+                keep = np.isin(candidates, allowed, assume_unique=True)
+                candidates, matched = candidates[keep], matched[keep]
+            missing = self.sizes[candidates] - matched
+        order = np.lexsort((-candidates, -matched, missing))
+        return candidates[order].tolist(), missing[order].tolist()
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,87 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, Count, F, FloatField, Value, When
+from django.db.models.functions import Greatest, TruncHour
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, Shopping
+
+# Вес добавления рецепта в избранное и в список покупок.
+WEIGHTS = {
+    Favorite: 1.0,
+    Shopping: 2.0,
+}
+
+
+def update_popularity(recipe_ids, model):
+    """
+    Сразу прибавляет вес события к популярности рецептов recipe_ids,
+    затухание учтёт decay_popularity.
+    """
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            popularity=F('popularity') + WEIGHTS[model]
+        )
+
+
+def withdraw_popularity(events, model, now=None):
+    """
+    Вычитает из популярности вес удалённых событий — пар (id рецепта,
+    время добавления) — в том виде, в каком он сейчас вошёл бы
+    в decayed_scores: затухший, а события старше окна не учитываются.
+    """
+    now = now or timezone.now()
+    half_life = timedelta(hours=settings.POPULARITY_HALF_LIFE_HOURS)
+    since = now - timedelta(days=settings.POPULARITY_WINDOW_DAYS)
+    weights = defaultdict(float)
+    for recipe_id, created in events:
+        if created >= since:
+            weights[recipe_id] += WEIGHTS[model] * 0.5 ** (
+                (now - created) / half_life
+            )
+    if weights:
+        Recipe.objects.filter(pk__in=weights).update(popularity=Greatest(
+            F('popularity') - Case(
+                *[When(pk=pk, then=Value(weight))
+                  for pk, weight in weights.items()],
+                default=Value(0.0), output_field=FloatField()
+            ),
+            Value(0.0)
+        ))
+
+
+def decayed_scores(now=None):
+    """
+    Популярность рецептов на момент now: события за последние
+    POPULARITY_WINDOW_DAYS, сгруппированные по часам, с весом,
+    убывающим вдвое каждые POPULARITY_HALF_LIFE_HOURS.
+    """
+    now = now or timezone.now()
+    half_life = timedelta(hours=settings.POPULARITY_HALF_LIFE_HOURS)
+    since = now - timedelta(days=settings.POPULARITY_WINDOW_DAYS)
+    scores = defaultdict(float)
+    for model, weight in WEIGHTS.items():
+        events = (
+            model.objects.filter(created__gte=since)
+            .annotate(hour=TruncHour('created'))
+            .order_by()
+            .values('recipe_id', 'hour')
+            .annotate(total=Count('pk'))
+            .values_list('recipe_id', 'hour', 'total')
+        )
+        for recipe_id, hour, total in events.iterator():
+            scores[recipe_id] += weight * total * 0.5 ** (
+                (now - hour) / half_life
+            )
+    return scores
+
+
+def popular_limit(value):
+    """Размер топа: limit из запроса в допустимых рамках."""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return settings.PAGE_SIZE
+    return min(max(limit, 1), settings.POPULAR_RECIPES_LIMIT)
@@ -0,0 +1,126 @@
+import asyncio
+import itertools
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_COOKIE = 'primary_db'
+
+replica_alias = ContextVar('replica_alias', default=None)
+
+
+class ReplicaPool:
+    """
+    Выбирает реплики по кругу. Реплику, к которой не удалось подключиться,
+    пропускает REPLICA_RETRY_SECONDS секунд.
+    """
+    def __init__(self):
+        self.counter = itertools.count()
+        self.down_until = {}
+
+    def is_down(self, alias):
+        return self.down_until.get(alias, 0) > time.monotonic()
+
+    def is_up(self, alias):
+        if self.is_down(alias):
+            return False
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            self.down_until[alias] = (
+                time.monotonic() + settings.REPLICA_RETRY_SECONDS
+            )
+            return False
+        return True
+
+    def choose(self):
+        """
+        Следующая по кругу реплика, не помеченная недоступной, или None.
+        Соединение не открывается: выбор делается в middleware, в том
+        числе в цикле событий ASGI, а подключается уже поток вьюхи.
+        """
+        aliases = settings.DATABASE_REPLICAS
+        start = next(self.counter)
+        for offset in range(len(aliases)):
+            alias = aliases[(start + offset) % len(aliases)]
+            if not self.is_down(alias):
+                return alias
+        return None
+
+
+replica_pool = ReplicaPool()
+
+
+class ReplicaRouter:
+    """
+    Чтение в безопасных запросах — с реплики, выбранной для всего запроса,
+    всё остальное — с основной базы. Если реплика перестала отвечать,
+    чтение уходит в основную базу. Вне запросов (команды, фоновые задачи)
+    реплики не используются.
+    """
+    def db_for_read(self, model, **hints):
+        alias = replica_alias.get()
+        if alias is not None and replica_pool.is_up(alias):
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaMiddleware:
+    """
+    Выбирает одну реплику на весь безопасный запрос, чтобы все его чтения
+    шли в одну базу. После успешной записи клиент получает cookie
+    и REPLICA_PIN_SECONDS секунд читает с основной базы, чтобы видеть
+    свои изменения.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.acall(request)
+        token = replica_alias.set(self.choose_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_alias.reset(token)
+        return self.pin(request, response)
+
+    async def acall(self, request):
+        token = replica_alias.set(self.choose_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_alias.reset(token)
+        return self.pin(request, response)
+
+    def choose_replica(self, request):
+        if (request.method in SAFE_METHODS
+                and PIN_COOKIE not in request.COOKIES):
+            return replica_pool.choose()
+        return None
+
+    def pin(self, request, response):
+        if (settings.DATABASE_REPLICAS
+                and request.method not in SAFE_METHODS
+                and response.status_code < 400):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
@@ -0,0 +1,197 @@
+import bisect
+import re
+import threading
+from functools import lru_cache
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection, connections
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.expressions import RawSQL
+
+from recipes.models import Ingredient
+
+from .cache import INGREDIENTS_VERSION, get_version, versions_db
+
+TRIGRAM_INDEX = 'recipes_ingredient_name_trgm'
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+FTS_TEXT = "replace(replace({0}, 'ё', 'е'), 'Ё', 'Е')"
+FTS_ROW = ', '.join(
+    FTS_TEXT.format(column) for column in ('{0}.name', '{0}.text')
+)
+FTS_SCHEMA = (
+    f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, text, tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, name, text)
+        VALUES (new.id, {FTS_ROW.format('new')});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON recipes_recipe BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF name, text ON recipes_recipe BEGIN
+        UPDATE {FTS_TABLE} SET (name, text) = ({FTS_ROW.format('new')})
+        WHERE rowid = new.id;
+    END
+    ''',
+    f'DELETE FROM {FTS_TABLE}',
+    f'''
+    INSERT INTO {FTS_TABLE} (rowid, name, text)
+    SELECT id, {FTS_ROW.format('recipes_recipe')} FROM recipes_recipe
+    ''',
+)
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """
+    Отсортированный по нормализованному названию каталог ингредиентов
+    в памяти воркера. Перестраивается, когда меняется версия каталога.
+    """
+    def __init__(self):
+        self.version = None
+        self.keys = []
+        self.ingredients = []
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        version = get_version(INGREDIENTS_VERSION)
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            items = sorted(
+                (normalize(name), pk, Ingredient(
+                    id=pk, name=name, measurement_unit=measurement_unit
+                ))
+                for pk, name, measurement_unit
+                in Ingredient.objects.using(versions_db())
+                .values_list('id', 'name', 'measurement_unit').iterator()
+            )
+            self.keys = [key for key, _, _ in items]
+            self.ingredients = [ingredient for _, _, ingredient in items]
+            self.version = version
+
+    def search(self, name, limit, measurement_unit=None):
+        self.refresh()
+        keys, ingredients = self.keys, self.ingredients
+        query = normalize(name)
+        start = bisect.bisect_left(keys, query)
+        end = bisect.bisect_left(keys, query + chr(0x10FFFF), lo=start)
+        contained = (
+            position for position, key in enumerate(keys)
+            if query in key and not start <= position < end
+        )
+        found = []
+        for position in chain(range(start, end), contained):
+            if len(found) >= limit:
+                break
+            ingredient = ingredients[position]
+            if measurement_unit in (None, ingredient.measurement_unit):
+                found.append(ingredient)
+        return found
+
+
+ingredient_index = IngredientIndex()
+
+
+@lru_cache(maxsize=None)
+def has_trigram_index():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_indexes WHERE indexname = %s',
+                       [TRIGRAM_INDEX])
+        return cursor.fetchone() is not None
+
+
+def search_database(name, limit, measurement_unit=None):
+    ingredients = Ingredient.objects.filter(name__icontains=name)
+    if measurement_unit is not None:
+        ingredients = ingredients.filter(measurement_unit=measurement_unit)
+    return list(
+        ingredients
+        .annotate(rank=Case(
+            When(name__istartswith=name, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField()
+        ))
+        .order_by('rank', 'name')[:limit]
+    )
+
+
+def use_database():
+    backend = settings.INGREDIENT_SEARCH_BACKEND
+    if backend == 'auto':
+        return has_trigram_index()
+    return backend == 'database'
+
+
+def search_ingredients(name, measurement_unit=None, limit=None):
+    """
+    Ингредиенты, название которых начинается с name, затем содержащие
+    name, не больше limit штук; с measurement_unit — только в этих единицах.
+    """
+    limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+    if use_database():
+        return search_database(name, limit, measurement_unit)
+    return ingredient_index.search(name, limit, measurement_unit)
+
+
+def ensure_fts(using):
+    """
+    Создаёт в SQLite таблицу FTS5 с триггерами вместо поискового вектора
+    PostgreSQL. Вызывается после каждой миграции: пересоздание таблицы
+    рецептов в SQLite удаляет её триггеры.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in FTS_SCHEMA:
+            cursor.execute(statement)
+
+
+def search_recipes(queryset, query):
+    """
+    Рецепты queryset, подходящие под query, по убыванию релевантности:
+    tsvector с GIN-индексом в PostgreSQL, FTS5 в SQLite.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-search_rank', '-id')
+    words = re.findall(r'\w+', normalize(query))
+    if not words:
+        return queryset.none()
+    match = ' '.join(f'"{word}"' for word in words)
+    return queryset.filter(
+        id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match,)
+        )
+    ).annotate(search_rank=RawSQL(
+        f'SELECT -rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+        f'AND rowid = recipes_recipe.id',
+        (match,)
+    )).order_by('-search_rank', '-id')
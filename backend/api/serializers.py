@@ -1,12 +1,17 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
-from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Shopping, Tag
 from users.models import Subscribe
 from users.serializers import UserSerializer
 
+from .fields import RecipeImagesField
+from .utils import update_shopping_totals
+
 User = get_user_model()
 
 
@@ -55,10 +60,33 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
 
 class RecipeFollowSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
+    images = RecipeImagesField(source='image')
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPE_BATCH_LIMIT
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
+class PantrySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.PANTRY_INGREDIENTS_LIMIT
+    )
+
+    def validate_ingredients(self, value):
+        return list(dict.fromkeys(value))
 
 
 class FollowSerializer(serializers.ModelSerializer):
@@ -69,7 +97,7 @@ class FollowSerializer(serializers.ModelSerializer):
     last_name = serializers.ReadOnlyField(source='author.last_name')
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(source='author.recipes.count')
+    recipes_count = serializers.ReadOnlyField(source='author.recipes_count')
 
     class Meta:
         model = Subscribe
@@ -77,12 +105,11 @@ class FollowSerializer(serializers.ModelSerializer):
                   'is_subscribed', 'recipes', 'recipes_count')
 
     def get_is_subscribed(self, obj):
-        return Subscribe.objects.filter(
-            user=obj.user,
-            author=obj.author
-        ).exists()
+        return True
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'recent_recipes'):
+            return RecipeFollowSerializer(obj.recent_recipes, many=True).data
         request = self.context.get('request')
         limit = request.GET.get('recipes_limit')
         queryset = Recipe.objects.filter(author=obj.author)
@@ -93,6 +120,7 @@ class FollowSerializer(serializers.ModelSerializer):
 
 class RecipeGetSerializer(serializers.ModelSerializer):
     image = Base64ImageField(max_length=None, use_url=True)
+    images = RecipeImagesField(source='image')
     ingredients = serializers.SerializerMethodField()
     author = UserSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
@@ -103,26 +131,41 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'author', 'name', 'text', 'ingredients', 'tags',
                   'cooking_time', 'is_favorited', 'is_in_shopping_cart',
-                  'image')
+                  'image', 'images')
         read_only_fields = ('id', 'author',)
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if user.is_anonymous:
             return False
         return obj.favorites.filter(user=user).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if user.is_anonymous:
             return False
         return obj.cart.filter(user=user).exists()
 
     def get_ingredients(self, obj):
-        recipe_ingredients = RecipeIngredient.objects.filter(recipe=obj)
-        return IngredientRecipeGetSerializer(recipe_ingredients,
+        return IngredientRecipeGetSerializer(obj.amount.all(),
                                              many=True).data
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
+
+class RecipeMatchSerializer(RecipeGetSerializer):
+    missing_ingredients = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeGetSerializer.Meta):
+        fields = RecipeGetSerializer.Meta.fields + ('missing_ingredients',)
+
 
 class IngredientsEditSerializer(serializers.ModelSerializer):
 
@@ -204,16 +247,55 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         return recipe
 
+    def update_tags(self, instance, tags):
+        current = {tag.id for tag in instance.tags.all()}
+        new = {tag.id for tag in tags}
+        if current - new:
+            instance.tags.remove(*(current - new))
+        if new - current:
+            instance.tags.add(*(new - current))
+
+    def update_ingredients(self, instance, ingredients):
+        current = {item.ingredient_id: item for item in instance.amount.all()}
+        new = {item['id']: item['amount'] for item in ingredients}
+        amounts = {
+            ingredient_id: new.get(ingredient_id, 0) - (
+                current[ingredient_id].amount
+                if ingredient_id in current else 0
+            )
+            for ingredient_id in current.keys() | new.keys()
+        }
+        amounts = {key: value for key, value in amounts.items() if value}
+        if not amounts:
+            return
+        removed = current.keys() - new.keys()
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=instance, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id in current.keys() & amounts.keys() - removed:
+            current[ingredient_id].amount = new[ingredient_id]
+            changed.append(current[ingredient_id])
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        self.create_ingredients(
+            [item for item in ingredients if item['id'] not in current],
+            instance
+        )
+        update_shopping_totals(
+            Shopping.objects.filter(recipe=instance).values_list(
+                'user_id', flat=True
+            ),
+            amounts
+        )
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop("ingredients")
         tags = validated_data.pop("tags")
-
-        instance.tags.clear()
-        instance.tags.set(tags)
-
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        self.create_ingredients(ingredients, instance)
-
+        self.update_tags(instance, tags)
+        self.update_ingredients(instance, ingredients)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
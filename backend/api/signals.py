@@ -0,0 +1,149 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save, pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.images import queue_image_processing
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            Shopping, Tag)
+from users.models import Subscribe
+
+from .authentication import token_cache
+from .cache import INGREDIENTS_VERSION, TAGS_VERSION, bump_version
+from .feed import fan_out
+from .metrics import install_query_stats
+from .pantry import log_changes
+from .popularity import withdraw_popularity
+from .search import ensure_fts
+from .utils import recipe_amounts, update_counter, update_shopping_totals
+
+User = get_user_model()
+
+
+@receiver(connection_created)
+def connection_opened(connection, **kwargs):
+    install_query_stats(connection)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(**kwargs):
+    transaction.on_commit(lambda: bump_version(INGREDIENTS_VERSION))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(**kwargs):
+    transaction.on_commit(lambda: bump_version(TAGS_VERSION))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, **kwargs):
+    name = instance.image.name
+    transaction.on_commit(lambda: queue_image_processing(name))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(instance, **kwargs):
+    recipe_ids = [instance.pk]
+    transaction.on_commit(lambda: log_changes(recipe_ids))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(instance, **kwargs):
+    recipe_ids = [instance.recipe_id]
+    transaction.on_commit(lambda: log_changes(recipe_ids))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        recipe_ids = [instance.pk]
+    elif action == 'pre_clear':
+        recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+    else:
+        recipe_ids = list(pk_set)
+    transaction.on_commit(lambda: log_changes(recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(instance, created, **kwargs):
+    """
+    Счётчик рецептов автора растёт при любом создании рецепта, так же
+    как recipe_deleting уменьшает его при любом удалении; после коммита
+    рецепт раскладывается по лентам подписчиков.
+    """
+    if created:
+        update_counter(User.objects.filter(pk=instance.author_id),
+                       'recipes_count', 1)
+        transaction.on_commit(lambda: fan_out(instance))
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(instance, **kwargs):
+    """
+    Счётчик рецептов автора и сводные списки покупок при любом удалении
+    рецепта: через API, в админке или каскадом вместе с автором.
+    """
+    update_shopping_totals(
+        list(Shopping.objects.filter(recipe=instance).values_list(
+            'user_id', flat=True
+        )),
+        recipe_amounts(instance, sign=-1)
+    )
+    update_counter(User.objects.filter(pk=instance.author_id),
+                   'recipes_count', -1)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(instance, **kwargs):
+    """
+    Избранное, списки покупок и подписки пользователя удаляются каскадом:
+    счётчики и популярность рецептов и авторов правим до этого.
+    """
+    update_counter(
+        Recipe.objects.filter(pk__in=Favorite.objects.filter(
+            user=instance
+        ).values('recipe_id')),
+        'favorites_count', -1
+    )
+    for model in (Favorite, Shopping):
+        withdraw_popularity(
+            list(model.objects.filter(user=instance).values_list(
+                'recipe_id', 'created'
+            )),
+            model
+        )
+    update_counter(
+        User.objects.filter(pk__in=Subscribe.objects.filter(
+            user=instance
+        ).values('author_id')),
+        'subscribers_count', -1
+    )
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    key = instance.key
+    transaction.on_commit(lambda: token_cache.evict(key))
+
+
+@receiver(post_save, sender=User)
+def user_saved(instance, created, **kwargs):
+    if created:
+        return
+    keys = list(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+    transaction.on_commit(
+        lambda: [token_cache.evict(key) for key in keys]
+    )
+
+
+@receiver(post_migrate)
+def migrated(sender, using, **kwargs):
+    if sender.label == 'recipes':
+        ensure_fts(using)
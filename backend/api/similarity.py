@@ -0,0 +1,98 @@
+import numpy as np
+from django.db.models import Count, Min
+from scipy import sparse
+
+from recipes.models import Recipe, RecipeIngredient, SimilarRecipe
+
+
+def id_pairs(queryset, first, second):
+    return np.array(
+        list(queryset.values_list(first, second).iterator()), dtype=np.int64
+    ).reshape(-1, 2)
+
+
+def feature_matrix():
+    """
+    Разреженная матрица рецепт × (ингредиенты, теги) из нулей и единиц
+    с нормированными строками: скалярное произведение строк — косинусное
+    сходство. Сходство пары зависит только от самих рецептов, поэтому
+    изменённые рецепты можно пересчитывать отдельно от остальных.
+    Возвращает id рецептов в порядке строк и матрицу.
+    """
+    recipe_ids = np.fromiter(
+        Recipe.objects.order_by('pk').values_list('pk', flat=True).iterator(),
+        dtype=np.int64
+    )
+    ingredients = id_pairs(RecipeIngredient.objects, 'recipe_id',
+                           'ingredient_id')
+    tags = id_pairs(Recipe.tags.through.objects, 'recipe_id', 'tag_id')
+    ingredient_ids, ingredient_cols = np.unique(ingredients[:, 1],
+                                                return_inverse=True)
+    tag_ids, tag_cols = np.unique(tags[:, 1], return_inverse=True)
+    rows = np.searchsorted(
+        recipe_ids, np.concatenate([ingredients[:, 0], tags[:, 0]])
+    )
+    cols = np.concatenate([ingredient_cols, tag_cols + len(ingredient_ids)])
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(recipe_ids), len(ingredient_ids) + len(tag_ids))
+    )
+    matrix.data[:] = 1
+    norms = np.sqrt(np.diff(matrix.indptr)).astype(np.float32)
+    scale = np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)
+    return recipe_ids, sparse.csr_matrix(sparse.diags(scale) @ matrix)
+
+
+def block_scores(matrix, matrix_t, rows):
+    """Плотный блок сходства строк rows со всеми рецептами, без себя."""
+    scores = (matrix[rows] @ matrix_t).toarray()
+    scores[np.arange(len(rows)), rows] = 0
+    return scores
+
+
+def top_neighbours(scores, count):
+    """
+    count лучших соседей для каждой строки блока: номера столбцов
+    и сходство по убыванию, нулевое сходство отброшено.
+    """
+    count = min(count, scores.shape[1] - 1)
+    if count < 1:
+        return
+    top = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    for cols, values in zip(top, top_scores):
+        positive = values > 0
+        yield cols[positive], values[positive]
+
+
+def affected_rows(recipe_ids, matrix, matrix_t, changed, count, block_size):
+    """
+    Строки, чьи списки соседей надо пересчитать после изменения рецептов
+    changed: сами изменённые, рецепты, у которых они уже в соседях, и
+    рецепты, у которых изменённый теперь войдёт в count лучших.
+    """
+    thresholds = np.zeros(len(recipe_ids), dtype=np.float32)
+    for recipe_id, lowest in (
+        SimilarRecipe.objects.order_by().values('recipe_id')
+        .annotate(total=Count('pk'), lowest=Min('score'))
+        .filter(total__gte=count).values_list('recipe_id', 'lowest')
+        .iterator()
+    ):
+        thresholds[np.searchsorted(recipe_ids, recipe_id)] = lowest
+    affected = np.zeros(len(recipe_ids), dtype=bool)
+    affected[changed] = True
+    for start in range(0, len(changed), block_size):
+        block = changed[start:start + block_size]
+        listing = np.fromiter(
+            SimilarRecipe.objects.filter(
+                similar_id__in=recipe_ids[block].tolist()
+            ).values_list('recipe_id', flat=True).distinct().iterator(),
+            dtype=np.int64
+        )
+        affected[np.searchsorted(recipe_ids, listing)] = True
+        scores = block_scores(matrix, matrix_t, block)
+        affected |= ((scores > 0) & (scores >= thresholds - 1e-6)).any(axis=0)
+    return np.flatnonzero(affected)
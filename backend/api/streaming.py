@@ -0,0 +1,55 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.http import StreamingHttpResponse
+
+
+class AsyncStreamingHttpResponse(StreamingHttpResponse):
+    """
+    Потоковый ответ, содержимое которого перебирается и for (WSGI), и
+    async for (ASGI). Django 3.2 под ASGI умеет только for в цикле
+    событий, поэтому async for делает StreamingASGIHandler.
+    """
+    def __init__(self, streaming_content=(), *args, **kwargs):
+        super().__init__(streaming_content, *args, **kwargs)
+        self.async_content = streaming_content
+
+    async def __aiter__(self):
+        async for part in self.async_content:
+            yield self.make_bytes(part)
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    ASGIHandler, который отдаёт AsyncStreamingHttpResponse через
+    async for: чтение из базы уходит в поток, цикл событий не блокируется.
+    """
+    async def send_response(self, response, send):
+        if not isinstance(response, AsyncStreamingHttpResponse):
+            await super().send_response(response, send)
+            return
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            headers.append(
+                (b'Set-Cookie', cookie.output(header='').encode('ascii')
+                 .strip())
+            )
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        async for part in response:
+            for chunk, _ in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from users.views import CustomUserViewSet
+from .async_views import async_read_urls
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet
 
 app_name = 'api'
@@ -12,8 +14,11 @@ router_v1.register('tags', TagViewSet, basename='tags')
 router_v1.register('ingredients', IngredientViewSet, basename='ingredients')
 router_v1.register('recipes', RecipeViewSet, basename='recipes')
 
+router_urls = router_v1.urls
+if settings.ASYNC_READS:
+    router_urls = async_read_urls(router_urls)
 
 urlpatterns = [
-    path('', include(router_v1.urls)),
+    path('', include(router_urls)),
     path('auth/', include('djoser.urls.authtoken'))
 ]
@@ -1,33 +1,442 @@
+import csv
+import os
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When, Window
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
 from rest_framework import status
 from rest_framework.response import Response
 
-from recipes.models import Recipe
+from recipes.models import (Favorite, Recipe, RecipeIngredient, Shopping,
+                            ShoppingIngredient)
+from users.models import Subscribe
+
+from .feed import prune
+from .popularity import update_popularity, withdraw_popularity
+
+User = get_user_model()
+
+SHOPPING_CART_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+PDF_FONT = 'Tantular'
+PDF_FONT_PATH = os.path.join(settings.BASE_DIR, 'data', 'Tantular.ttf')
+PDF_MARGIN = 50
+PDF_LINE_HEIGHT = 20
+
+
+def recipe_amounts(recipe, sign=1):
+    return {
+        ingredient_id: sign * amount
+        for ingredient_id, amount
+        in recipe.amount.values_list('ingredient_id', 'amount')
+    }
+
+
+def update_counter(queryset, field, delta):
+    """
+    UPDATE ... SET field = field + delta для строк queryset.
+    """
+    if delta:
+        queryset.update(**{field: F(field) + delta})
 
 
+def recipes_amounts(recipe_ids, sign=1):
+    """
+    Суммарные количества ингредиентов рецептов recipe_ids.
+    """
+    return dict(
+        RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
+        .order_by()
+        .values('ingredient_id')
+        .annotate(total=sign * Sum('amount'))
+        .values_list('ingredient_id', 'total')
+    )
+
+
+def update_shopping_totals(user_ids, amounts):
+    """
+    Прибавляет amounts ({ingredient_id: количество}) к сводным спискам
+    покупок пользователей user_ids, опустевшие строки удаляет.
+    """
+    amounts = {
+        ingredient_id: amount
+        for ingredient_id, amount in amounts.items() if amount
+    }
+    if not amounts:
+        return
+    ShoppingIngredient.objects.bulk_create(
+        [
+            ShoppingIngredient(user_id=user_id, ingredient_id=ingredient_id)
+            for user_id in user_ids
+            for ingredient_id, amount in amounts.items() if amount > 0
+        ],
+        ignore_conflicts=True
+    )
+    totals = ShoppingIngredient.objects.filter(
+        user_id__in=user_ids,
+        ingredient_id__in=amounts.keys()
+    )
+    totals.update(total_amount=F('total_amount') + Case(
+        *[
+            When(ingredient_id=ingredient_id, then=Value(amount))
+            for ingredient_id, amount in amounts.items()
+        ],
+        default=Value(0),
+        output_field=IntegerField()
+    ))
+    totals.filter(total_amount__lte=0).delete()
+
+
+def attach_recent_recipes(follows, limit=None):
+    """
+    Одним запросом подгружает подписанным авторам по limit последних
+    рецептов (ROW_NUMBER() OVER (PARTITION BY author_id)).
+    """
+    recipes = Recipe.objects.filter(
+        author_id__in={follow.author_id for follow in follows}
+    )
+    if limit:
+        sql, params = recipes.annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=F('id').desc()
+        )).query.sql_with_params()
+        recipes = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE row_number <= %s '
+            f'ORDER BY id DESC',
+            (*params, int(limit))
+        )
+    by_author = {follow.author_id: [] for follow in follows}
+    for recipe in recipes:
+        by_author[recipe.author_id].append(recipe)
+    for follow in follows:
+        follow.recent_recipes = by_author[follow.author_id]
+    return follows
+
+
+def insert_ignore(model, fields, rows, returning='id'):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING одним запросом.
+    Возвращает значения столбца returning только для добавленных строк.
+    """
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    opts = model._meta
+    fields = [opts.get_field(name) for name in fields]
+    columns = ', '.join(quote(field.column) for field in fields)
+    placeholders = ', '.join(
+        [f'({", ".join(["%s"] * len(fields))})'] * len(rows)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(opts.db_table)} ({columns}) '
+            f'VALUES {placeholders} ON CONFLICT DO NOTHING '
+            f'RETURNING {quote(opts.get_field(returning).column)}',
+            [
+                field.get_db_prep_save(value, connection)
+                for row in rows for field, value in zip(fields, row)
+            ],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def delete_returning(model, user_id, recipe_ids=None):
+    """
+    DELETE ... RETURNING одним запросом: удаляет записи пользователя
+    (все или только recipe_ids) и возвращает пары (id рецепта, время
+    добавления) — по ним вычитается затухший вес из популярности.
+    """
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    sql = (
+        f'DELETE FROM {quote(model._meta.db_table)} '
+        f'WHERE {quote("user_id")} = %s'
+    )
+    params = [user_id]
+    if recipe_ids is not None:
+        sql += f' AND {quote("recipe_id")} IN '
+        sql += f'({", ".join(["%s"] * len(recipe_ids))})'
+        params.extend(recipe_ids)
+    created = model._meta.get_field('created').get_col(model._meta.db_table)
+    converters = (connection.ops.get_db_converters(created)
+                  + created.get_db_converters(connection))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{sql} RETURNING {quote("recipe_id")}, {quote("created")}',
+            params
+        )
+        rows = cursor.fetchall()
+    events = []
+    for recipe_id, value in rows:
+        for converter in converters:
+            value = converter(value, created, connection)
+        events.append((recipe_id, value))
+    return events
+
+
+@transaction.atomic
 def post(request, pk, model, serializer):
     recipe = get_object_or_404(Recipe, pk=pk)
-    if model.objects.filter(user=request.user, recipe=recipe).exists():
+    if not insert_ignore(
+        model, ('user', 'recipe', 'created'),
+        [(request.user.id, recipe.id, timezone.now())]
+    ):
         return Response(
             {'errors': 'Рецепт уже есть в избранном/списке покупок'},
             status=status.HTTP_400_BAD_REQUEST,
         )
-    model.objects.get_or_create(user=request.user, recipe=recipe)
+    if model is Shopping:
+        update_shopping_totals([request.user.id], recipe_amounts(recipe))
+    if model is Favorite:
+        update_counter(Recipe.objects.filter(pk=recipe.pk),
+                       'favorites_count', 1)
+    update_popularity([recipe.pk], model)
     data = serializer(recipe).data
     return Response(data, status=status.HTTP_201_CREATED)
 
 
+@transaction.atomic
 def delete(request, pk, model):
-    recipe = get_object_or_404(Recipe, pk=pk)
-    if model.objects.filter(user=request.user, recipe=recipe).exists():
-        follow = get_object_or_404(model, user=request.user,
-                                   recipe=recipe)
-        follow.delete()
+    removed = delete_returning(model, request.user.id, [pk])
+    if removed:
+        if model is Shopping:
+            update_shopping_totals(
+                [request.user.id], recipe_amounts(Recipe(pk=pk), sign=-1)
+            )
+        if model is Favorite:
+            update_counter(Recipe.objects.filter(pk=pk),
+                           'favorites_count', -1)
+        withdraw_popularity(removed, model)
         return Response(
             'Рецепт успешно удален из избранного/списка покупок',
             status=status.HTTP_204_NO_CONTENT
         )
+    get_object_or_404(Recipe, pk=pk)
     return Response(
         {'errors': 'Данного рецепта не было в избранном/списке покупок'},
         status=status.HTTP_400_BAD_REQUEST
     )
+
+
+@transaction.atomic
+def post_many(user, recipe_ids, model):
+    """
+    Добавляет рецепты recipe_ids в избранное/список покупок одной вставкой.
+    Возвращает статус по каждому id.
+    """
+    found = set(
+        Recipe.objects.filter(id__in=recipe_ids).values_list('id', flat=True)
+    )
+    added = set()
+    if found:
+        now = timezone.now()
+        added.update(insert_ignore(
+            model, ('user', 'recipe', 'created'),
+            [(user.id, recipe_id, now) for recipe_id in found],
+            returning='recipe'
+        ))
+    if model is Shopping and added:
+        update_shopping_totals([user.id], recipes_amounts(added))
+    if model is Favorite and added:
+        update_counter(Recipe.objects.filter(pk__in=added),
+                       'favorites_count', 1)
+    update_popularity(added, model)
+    return [
+        {'id': recipe_id, 'status': (
+            'added' if recipe_id in added
+            else 'exists' if recipe_id in found
+            else 'not_found'
+        )}
+        for recipe_id in recipe_ids
+    ]
+
+
+@transaction.atomic
+def delete_many(user, recipe_ids, model):
+    """
+    Удаляет рецепты recipe_ids (или все, если None) из избранного/списка
+    покупок одним запросом. Возвращает статус по каждому id.
+    """
+    events = delete_returning(model, user.id, recipe_ids)
+    removed = [recipe_id for recipe_id, _ in events]
+    if model is Shopping and removed:
+        if recipe_ids is None:
+            ShoppingIngredient.objects.filter(user=user).delete()
+        else:
+            update_shopping_totals(
+                [user.id], recipes_amounts(removed, sign=-1)
+            )
+    if model is Favorite and removed:
+        update_counter(Recipe.objects.filter(pk__in=removed),
+                       'favorites_count', -1)
+    withdraw_popularity(events, model)
+    if recipe_ids is None:
+        return [{'id': recipe_id, 'status': 'removed'}
+                for recipe_id in removed]
+    removed = set(removed)
+    found = removed | set(
+        Recipe.objects.filter(
+            id__in=set(recipe_ids) - removed
+        ).values_list('id', flat=True)
+    )
+    return [
+        {'id': recipe_id, 'status': (
+            'removed' if recipe_id in removed
+            else 'missing' if recipe_id in found
+            else 'not_found'
+        )}
+        for recipe_id in recipe_ids
+    ]
+
+
+def unsubscribe(user, author):
+    """
+    Удаляет подписку user на author вместе с рецептами автора в ленте
+    и уменьшает счётчик подписчиков. Возвращает, была ли подписка.
+    """
+    deleted, _ = Subscribe.objects.filter(user=user, author=author).delete()
+    if deleted:
+        update_counter(User.objects.filter(pk=author.pk),
+                       'subscribers_count', -1)
+        prune(user, author)
+    return bool(deleted)
+
+
+def shopping_cart_page(user, after=None, size=None):
+    """
+    Страница сводного списка покупок пользователя после ключа after —
+    пары (название, единица измерения) последней прочитанной строки.
+    """
+    queryset = ShoppingIngredient.objects.filter(user=user)
+    if after is not None:
+        name, measurement_unit = after
+        queryset = queryset.filter(
+            Q(ingredient__name__gt=name)
+            | Q(ingredient__name=name,
+                ingredient__measurement_unit__gt=measurement_unit)
+        )
+    return list(
+        queryset.values_list('ingredient__name',
+                             'ingredient__measurement_unit', 'total_amount')
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+        [:size or settings.SHOPPING_CART_PAGE_SIZE]
+    )
+
+
+class ShoppingCartRows:
+    """
+    Сводный список покупок, читаемый страницами по ключу: в памяти не
+    больше одной страницы. Под WSGI перебирается обычным for, под ASGI —
+    async for, и тогда страницы читаются в потоке через sync_to_async,
+    а не в цикле событий.
+    """
+    def __init__(self, user, page_size=None):
+        self.user = user
+        self.page_size = page_size or settings.SHOPPING_CART_PAGE_SIZE
+
+    def __iter__(self):
+        after = None
+        while True:
+            page = shopping_cart_page(self.user, after, self.page_size)
+            yield from page
+            if len(page) < self.page_size:
+                return
+            after = page[-1][:2]
+
+    async def __aiter__(self):
+        fetch = sync_to_async(shopping_cart_page)
+        after = None
+        while True:
+            page = await fetch(self.user, after, self.page_size)
+            for row in page:
+                yield row
+            if len(page) < self.page_size:
+                return
+            after = page[-1][:2]
+
+
+def shopping_cart_rows(user):
+    return ShoppingCartRows(user)
+
+
+class StreamLines:
+    """
+    Строки выгрузки: header (если есть), затем line(row) для каждой
+    строки rows. Перебирается и for, и async for — как сами rows.
+    """
+    def __init__(self, rows, line, header=None):
+        self.rows = rows
+        self.line = line
+        self.header = header
+
+    def __iter__(self):
+        if self.header is not None:
+            yield self.line(self.header)
+        for row in self.rows:
+            yield self.line(row)
+
+    async def __aiter__(self):
+        if self.header is not None:
+            yield self.line(self.header)
+        async for row in self.rows:
+            yield self.line(row)
+
+
+def shopping_cart_txt_line(row):
+    name, measurement_unit, amount = row
+    return f'{name} {measurement_unit} - {amount}\n'
+
+
+def shopping_cart_txt(rows):
+    return StreamLines(rows, shopping_cart_txt_line)
+
+
+class Echo:
+    """
+    Псевдобуфер для csv.writer: возвращает строку вместо записи.
+    """
+    def write(self, value):
+        return value
+
+
+def shopping_cart_csv(rows):
+    return StreamLines(rows, csv.writer(Echo()).writerow,
+                       SHOPPING_CART_HEADER)
+
+
+def shopping_cart_pdf(rows):
+    """
+    Собирает PDF постранично во временный файл, который большие списки
+    сбрасывают на диск вместо памяти.
+    """
+    if PDF_FONT not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(PDF_FONT, PDF_FONT_PATH))
+    buffer = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    canvas = Canvas(buffer, pagesize=A4)
+    width, height = A4
+    top = height - PDF_MARGIN
+    canvas.setFont(PDF_FONT, 20)
+    canvas.drawString(PDF_MARGIN, top, 'Список покупок')
+    y = top - 2 * PDF_LINE_HEIGHT
+    canvas.setFont(PDF_FONT, 14)
+    for name, measurement_unit, amount in rows:
+        if y < PDF_MARGIN:
+            canvas.showPage()
+            canvas.setFont(PDF_FONT, 14)
+            y = top
+        canvas.drawString(
+            PDF_MARGIN, y, f'• {name} ({measurement_unit}) — {amount}'
+        )
+        y -= PDF_LINE_HEIGHT
+    canvas.save()
+    buffer.seek(0)
+    return buffer
@@ -1,34 +1,65 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import Exists, OuterRef, Prefetch
+from django.http import FileResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from .cache import INGREDIENTS_VERSION, TAGS_VERSION, get_tag_ids
+from .feed import feed_filter
 from .filters import IngredientFilter, RecipeFilter
-from .mixins import ListRetrieveViewSet
-from .pagination import CustomPageNumberPagination
+from .mixins import CatalogueCacheMixin, ListRetrieveViewSet
+from .pagination import (CustomPageNumberPagination, IdCursorPagination,
+                         ListPageNumberPagination)
+from .pantry import pantry_index
 from .permissions import IsAuthorOrReadOnly
+from .popularity import popular_limit
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                             Shopping, Tag)
-from .serializers import (IngredientSerializer, RecipeFollowSerializer,
-                          RecipeGetSerializer, RecipeSerializer, TagSerializer)
-from .utils import delete, post
+from .renderers import (CSVShoppingCartRenderer, PDFShoppingCartRenderer,
+                        TextShoppingCartRenderer)
+from .search import search_ingredients
+from .serializers import (IngredientSerializer, PantrySerializer,
+                          RecipeFollowSerializer, RecipeGetSerializer,
+                          RecipeIdsSerializer, RecipeMatchSerializer,
+                          RecipeSerializer, TagSerializer)
+from .streaming import AsyncStreamingHttpResponse
+from users.models import Subscribe
+from .utils import (delete, delete_many, post, post_many, shopping_cart_csv,
+                    shopping_cart_pdf, shopping_cart_rows, shopping_cart_txt)
 
+SHOPPING_CART_WRITERS = {
+    'txt': shopping_cart_txt,
+    'csv': shopping_cart_csv,
+}
 
-class TagViewSet(ListRetrieveViewSet):
+
+class TagViewSet(CatalogueCacheMixin, ListRetrieveViewSet):
+    catalogue_version = TAGS_VERSION
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
 
 
-class IngredientViewSet(ListRetrieveViewSet):
+class IngredientViewSet(CatalogueCacheMixin, ListRetrieveViewSet):
+    catalogue_version = INGREDIENTS_VERSION
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        ingredients = search_ingredients(
+            name, request.query_params.get('measurement_unit') or None
+        )
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
@@ -36,6 +67,31 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
     pagination_class = CustomPageNumberPagination
 
+    def get_queryset(self):
+        queryset = Recipe.objects.defer('search_vector').select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'amount',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                Shopping.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            author_is_subscribed=Exists(
+                Subscribe.objects.filter(user=user, author=OuterRef('author'))
+            )
+        )
+
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         self.perform_destroy(instance)
@@ -51,7 +107,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return RecipeSerializer
 
     def get_permissions(self):
-        if self.action != 'create':
+        if self.action not in ('create', 'download_shopping_cart',
+                               'favorite_batch', 'shopping_cart_batch',
+                               'feed'):
             return (IsAuthorOrReadOnly(),)
         return super().get_permissions()
 
@@ -67,27 +125,124 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return post(request, pk, Shopping, RecipeFollowSerializer)
         return delete(request, pk, Shopping)
 
+    def batch(self, request, model, clear=False):
+        if request.method == 'DELETE' and clear and not request.data:
+            return Response(delete_many(request.user, None, model))
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        if request.method == 'POST':
+            return Response(post_many(request.user, recipe_ids, model))
+        return Response(delete_many(request.user, recipe_ids, model))
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='favorite',
+        permission_classes=[IsAuthenticated],
+    )
+    def favorite_batch(self, request):
+        return self.batch(request, Favorite)
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='shopping_cart',
+        permission_classes=[IsAuthenticated],
+    )
+    def shopping_cart_batch(self, request):
+        return self.batch(request, Shopping, clear=True)
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=[IsAuthenticated],
+        pagination_class=IdCursorPagination,
+    )
+    def feed(self, request):
+        queryset = self.get_queryset().filter(feed_filter(request.user))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['GET'])
+    def similar(self, request, pk):
+        recipe = self.get_object()
+        queryset = self.get_queryset().filter(
+            similar_to__recipe=recipe
+        ).order_by('-similar_to__score', '-id')
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        pagination_class=ListPageNumberPagination,
+    )
+    def match(self, request):
+        pantry = PantrySerializer(
+            data={'ingredients': request.query_params.getlist('ingredients')}
+        )
+        pantry.is_valid(raise_exception=True)
+        filterset = RecipeFilter(request.query_params, request=request,
+                                 queryset=Recipe.objects.none())
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        tag_ids = get_tag_ids()
+        recipe_ids, missing = pantry_index.match(
+            pantry.validated_data['ingredients'],
+            [tag_ids[slug] for slug in filterset.form.cleaned_data['tags']],
+            bool(filterset.form.cleaned_data['tags_all'])
+        )
+        page = self.paginate_queryset(list(zip(recipe_ids, missing)))
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _ in page]
+        )
+        matched = []
+        for recipe_id, missing_ingredients in page:
+            if recipe_id in recipes:
+                recipe = recipes[recipe_id]
+                recipe.missing_ingredients = missing_ingredients
+                matched.append(recipe)
+        serializer = RecipeMatchSerializer(
+            matched, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['GET'])
+    def popular(self, request):
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            popularity__gt=0
+        ).order_by('-popularity', '-id')
+        serializer = self.get_serializer(
+            queryset[:popular_limit(request.query_params.get('limit'))],
+            many=True
+        )
+        return Response(serializer.data)
+
     @action(
         methods=["get"],
         detail=False,
-        permission_classes=[IsAuthenticatedOrReadOnly],
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[TextShoppingCartRenderer, CSVShoppingCartRenderer,
+                          PDFShoppingCartRenderer],
     )
     def download_shopping_cart(self, request):
-        shopping_cart = (
-            RecipeIngredient.objects.filter(
-                recipe__cart__user=request.user
+        renderer = request.accepted_renderer
+        filename = f'shopping_list.{renderer.format}'
+        rows = shopping_cart_rows(request.user)
+        if renderer.format == 'pdf':
+            return FileResponse(
+                shopping_cart_pdf(rows),
+                as_attachment=True,
+                filename=filename,
+                content_type=renderer.media_type
             )
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(amount_total=Sum("amount"))
+        response = AsyncStreamingHttpResponse(
+            SHOPPING_CART_WRITERS[renderer.format](rows),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
         )
-        content = [
-            f'{item["ingredient__name"]}'
-            f' {item["ingredient__measurement_unit"]}'
-            f' - {item["amount_total"]}\n'
-            for item in shopping_cart
-        ]
-        response = HttpResponse(content, content_type="text/plain")
         response[
             "Content-Disposition"
-        ] = 'attachment; filename="shopping_list.txt"'
+        ] = f'attachment; filename="{filename}"'
         return response
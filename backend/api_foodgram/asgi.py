@@ -0,0 +1,12 @@
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_foodgram.settings')
+os.environ.setdefault('ASYNC_READS', 'True')
+
+django.setup(set_prefix=False)
+
+from api.streaming import StreamingASGIHandler  # noqa: E402
+
+application = StreamingASGIHandler()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -10,6 +11,9 @@ SECRET_KEY = os.getenv('SECRET_KEY', 'gdh3ввa5tegr177324dytjGdhtsr')
 
 DEBUG = False
 
+# Асинхронные обёртки для чтения рецептов, тегов и ингредиентов (ASGI).
+ASYNC_READS = os.getenv('ASYNC_READS', 'False').lower() == 'true'
+
 ALLOWED_HOSTS = [
     '*',
 ]
@@ -31,6 +35,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,6 +77,47 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения: HOST[:PORT] через запятую, для SQLite — пути к файлам.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1
+):
+    if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        location = {'NAME': replica}
+    else:
+        host, _, port = replica.partition(':')
+        location = {'HOST': host, 'PORT': port or DATABASES['default']['PORT']}
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'], **location, 'TEST': {'MIRROR': 'default'}
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+# Сколько секунд после записи клиент читает с основной базы.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+# Через сколько секунд снова пробовать недоступную реплику.
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', 30))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'foodgram_cache')
+        ),
+    }
+}
+
+# Версии каталогов тегов и ингредиентов: сколько секунд воркер верит своей
+# копии и сколько версия живёт в общем кеше (источник — таблица в базе).
+CATALOGUE_VERSION_LOCAL_TTL = float(
+    os.getenv('CATALOGUE_VERSION_LOCAL_TTL', 1)
+)
+CATALOGUE_VERSION_TTL = int(os.getenv('CATALOGUE_VERSION_TTL', 60))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -100,7 +147,9 @@ STATIC_URL = '/backend_static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'backend_static')
 
 MEDIA_URL = '/backend_media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'backend_media')
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', os.path.join(BASE_DIR, 'backend_media'))
+
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
 
 EMPTY_VALUE_DISPLAY = '-пусто-'
 
@@ -110,6 +159,38 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 PAGE_SIZE = 6
 
+# memory — индекс префиксов в каждом воркере, database — GIN-индекс pg_trgm,
+# auto — database, если индекс есть в базе.
+INGREDIENT_SEARCH_BACKEND = os.getenv('INGREDIENT_SEARCH_BACKEND', 'auto')
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+
+# Сколько строк списка покупок читается из базы за раз при выгрузке.
+SHOPPING_CART_PAGE_SIZE = int(os.getenv('SHOPPING_CART_PAGE_SIZE', 500))
+
+# Сколько рецептов можно добавить/удалить одним запросом.
+RECIPE_BATCH_LIMIT = int(os.getenv('RECIPE_BATCH_LIMIT', 100))
+
+# Лента подписок: у авторов с большим числом подписчиков рецепты не
+# раскладываются по лентам, а подмешиваются при чтении. Размер пакета
+# вставки и сколько последних рецептов автора попадает в ленту при подписке.
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', 10000))
+FEED_BATCH_SIZE = int(os.getenv('FEED_BATCH_SIZE', 1000))
+FEED_BACKFILL_SIZE = int(os.getenv('FEED_BACKFILL_SIZE', 100))
+
+# Популярность рецептов: вклад события убывает вдвое за период полураспада,
+# события старше окна не учитываются. Максимальный размер топа.
+POPULARITY_HALF_LIFE_HOURS = float(os.getenv('POPULARITY_HALF_LIFE_HOURS', 48))
+POPULARITY_WINDOW_DAYS = int(os.getenv('POPULARITY_WINDOW_DAYS', 7))
+POPULAR_RECIPES_LIMIT = int(os.getenv('POPULAR_RECIPES_LIMIT', 50))
+
+# Сколько похожих рецептов хранится и отдаётся для каждого рецепта.
+SIMILAR_RECIPES_COUNT = int(os.getenv('SIMILAR_RECIPES_COUNT', 10))
+
+# Подбор рецептов по продуктам: сколько ингредиентов можно передать и
+# сколько изменений индекс подтягивает по журналу, а не строит заново.
+PANTRY_INGREDIENTS_LIMIT = int(os.getenv('PANTRY_INGREDIENTS_LIMIT', 50))
+PANTRY_MAX_CHANGES = int(os.getenv('PANTRY_MAX_CHANGES', 1000))
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -118,10 +199,17 @@ REST_FRAMEWORK = {
         "django_filters.rest_framework.DjangoFilterBackend"
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 }
 
+# Кеш токенов: записей в памяти воркера, время жизни в памяти и в общем
+# кеше. Отзыв виден сразу: метка отзыва в общем кеше проверяется на каждом
+# запросе и живёт TOKEN_CACHE_TTL.
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_LOCAL_TTL = int(os.getenv('TOKEN_CACHE_LOCAL_TTL', 5))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 300))
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USERS': False,
@@ -1,17 +1,155 @@
+from collections import defaultdict
+
+from django import forms
 from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+
+from api.utils import delete_many, update_shopping_totals
 
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient, Shopping,
                      Tag)
 
+User = get_user_model()
+
+# Ниже этой оценки числа строк считаем точно.
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Для списка без фильтров берёт число строк из статистики PostgreSQL
+    вместо COUNT(*) по всей таблице.
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return super().count
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < ESTIMATED_COUNT_THRESHOLD:
+            return super().count
+        return row[0]
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """
+    Фильтр по внешнему ключу field_name: поле с автодополнением вместо
+    списка всех значений в боковой панели.
+    """
+    template = 'admin/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        field = model._meta.get_field(self.field_name)
+        self.title = field.verbose_name
+        self.parameter_name = f'{self.field_name}__{field.target_field.name}'
+        super().__init__(request, params, model, model_admin)
+        self.form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(
+                field, model_admin.admin_site, attrs={'style': 'width: 100%'}
+            ),
+            required=False
+        )
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+    def rendered_widget(self):
+        return self.form_field.widget.render(
+            self.parameter_name, self.value()
+        )
+
+
+def autocomplete_filter(field_name):
+    return type(f'{field_name.title()}AutocompleteFilter',
+                (AutocompleteFilter,), {'field_name': field_name})
+
+
+class BigTableAdmin(admin.ModelAdmin):
+    """
+    Админка большой таблицы: оценка числа строк вместо COUNT(*)
+    и фильтры с автодополнением.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = settings.EMPTY_VALUE_DISPLAY
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if (isinstance(list_filter, type)
+                    and issubclass(list_filter, AutocompleteFilter)):
+                field = self.model._meta.get_field(list_filter.field_name)
+                return media + AutocompleteSelect(
+                    field, self.admin_site
+                ).media + forms.Media(js=['recipes/autocomplete_filter.js'])
+        return media
+
+
+class UserRecipeAdminMixin:
+    """
+    Избранное и списки покупок: добавляются только через API, а удаляются
+    через delete_many, как в API, чтобы вместе с записями поправить
+    счётчики, популярность и сводные списки покупок.
+    """
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_model(self, request, obj):
+        delete_many(obj.user, [obj.recipe_id], self.model)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = defaultdict(list)
+        for user_id, recipe_id in queryset.values_list('user_id',
+                                                       'recipe_id'):
+            recipe_ids[user_id].append(recipe_id)
+        for user in User.objects.filter(pk__in=recipe_ids):
+            delete_many(user, recipe_ids[user.pk], self.model)
+
 
 class TagAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'color', 'slug')
+    list_display = ('id', 'name', 'color', 'slug', 'count_recipes')
     search_fields = ('name', 'color', 'slug')
     list_filter = ('name', 'color', 'slug',)
     ordering = ('name',)
     empty_value_display = settings.EMPTY_VALUE_DISPLAY
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_total=Count('recipe')
+        )
+
+    @admin.display(description='Рецептов', ordering='recipes_total')
+    def count_recipes(self, obj):
+        return obj.recipes_total
+
 
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'measurement_unit')
@@ -21,36 +159,84 @@ class IngredientAdmin(admin.ModelAdmin):
     empty_value_display = settings.EMPTY_VALUE_DISPLAY
 
 
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'author', 'count_favorites')
-    search_fields = ('username', 'email', 'first_name', 'last_name',)
-    list_filter = ('author', 'name', 'tags',)
+class RecipeAdmin(BigTableAdmin):
+    list_display = ('id', 'name', 'author', 'count_favorites',
+                    'count_in_carts')
+    list_select_related = ('author',)
+    search_fields = ('name', 'author__username')
+    list_filter = (autocomplete_filter('author'), 'tags',)
+    autocomplete_fields = ('author',)
     ordering = ('name',)
-    empty_value_display = settings.EMPTY_VALUE_DISPLAY
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            carts_total=Coalesce(Subquery(
+                Shopping.objects.filter(recipe=OuterRef('pk'))
+                .order_by().values('recipe').annotate(total=Count('pk'))
+                .values('total')
+            ), 0)
+        )
+
+    @admin.display(description='В избранном',
+                   ordering='favorites_count')
     def count_favorites(self, obj):
-        return obj.favorites.count()
-
+        return obj.favorites_count
 
-class RecipeIngredientAdmin(admin.ModelAdmin):
-    list_display = ('id', 'recipe', 'ingredient', 'amount')
-    search_fields = ('recipe', 'ingredient',)
-    list_filter = ('recipe', 'ingredient',)
-    empty_value_display = settings.EMPTY_VALUE_DISPLAY
+    @admin.display(description='В списках покупок', ordering='carts_total')
+    def count_in_carts(self, obj):
+        return obj.carts_total
 
 
-class FavoriteAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(BigTableAdmin):
+    list_display = ('id', 'recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    search_fields = ('recipe__name', 'ingredient__name',)
+    list_filter = (autocomplete_filter('recipe'),
+                   autocomplete_filter('ingredient'),)
+
+    # Ингредиенты рецепта меняются только через API, где вместе с ними
+    # пересчитываются сводные списки покупок. Удаление разрешено, чтобы
+    # работали каскады от рецептов, и вычитает количества из списков.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request,
+                             RecipeIngredient.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for recipe_id, ingredient_id, amount in queryset.values_list(
+                'recipe_id', 'ingredient_id', 'amount'
+            ):
+                update_shopping_totals(
+                    list(Shopping.objects.filter(
+                        recipe_id=recipe_id
+                    ).values_list('user_id', flat=True)),
+                    {ingredient_id: -amount}
+                )
+            queryset.delete()
+
+
+class FavoriteAdmin(UserRecipeAdminMixin, BigTableAdmin):
     list_display = ('id', 'user', 'recipe')
-    search_fields = ('user', 'recipe',)
-    list_filter = ('user', 'recipe',)
-    empty_value_display = settings.EMPTY_VALUE_DISPLAY
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name',)
+    list_filter = (autocomplete_filter('user'),
+                   autocomplete_filter('recipe'),)
+    autocomplete_fields = ('user', 'recipe')
 
 
-class ShoppingAdmin(admin.ModelAdmin):
+class ShoppingAdmin(UserRecipeAdminMixin, BigTableAdmin):
     list_display = ('id', 'user', 'recipe')
-    search_fields = ('user', 'recipe',)
-    list_filter = ('user', 'recipe',)
-    empty_value_display = settings.EMPTY_VALUE_DISPLAY
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name',)
+    list_filter = (autocomplete_filter('user'),
+                   autocomplete_filter('recipe'),)
+    autocomplete_fields = ('user', 'recipe')
 
 
 admin.site.register(Tag, TagAdmin)
@@ -0,0 +1,117 @@
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SIZES = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+IMAGE_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+DERIVED_DIR = 'derived'
+
+executors = {}
+executors_lock = threading.Lock()
+
+
+def derived_name(name, size, extension):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, DERIVED_DIR,
+                        f'{stem}_{size}.{extension}')
+
+
+def derived_names(name):
+    return [
+        derived_name(name, size, extension)
+        for size in IMAGE_SIZES for extension in IMAGE_FORMATS
+    ]
+
+
+def is_processed(name):
+    # Производные пишутся по порядку, последний файл появляется последним.
+    return default_storage.exists(derived_names(name)[-1])
+
+
+def resize_image(source, targets):
+    """
+    Выполняется в отдельном процессе: только Pillow и файловая система.
+    targets — {(size, extension): path}.
+    """
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original).convert('RGB')
+    for (size, extension), target in targets.items():
+        resized = image.copy()
+        resized.thumbnail(IMAGE_SIZES[size], Image.LANCZOS)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temporary = f'{target}.tmp'
+        resized.save(temporary, IMAGE_FORMATS[extension], quality=85)
+        os.replace(temporary, target)
+    return source
+
+
+def image_targets(name):
+    return {
+        (size, extension): default_storage.path(
+            derived_name(name, size, extension)
+        )
+        for size in IMAGE_SIZES for extension in IMAGE_FORMATS
+    }
+
+
+def get_executor():
+    # Пул создаётся лениво, уже в процессе воркера gunicorn.
+    with executors_lock:
+        if os.getpid() not in executors:
+            executors[os.getpid()] = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PROCESSING_WORKERS
+            )
+        return executors[os.getpid()]
+
+
+def log_failure(future):
+    if future.exception() is not None:
+        logger.error('Не удалось обработать изображение',
+                     exc_info=future.exception())
+
+
+def queue_image_processing(name):
+    """
+    Ставит нарезку изображения name в очередь пула процессов.
+    """
+    if not name or is_processed(name):
+        return
+    get_executor().submit(
+        resize_image, default_storage.path(name), image_targets(name)
+    ).add_done_callback(log_failure)
+
+
+def image_urls(name, build_url=None):
+    """
+    Адреса производных изображения по размерам и форматам; пока они не
+    готовы, везде отдаётся оригинал.
+    """
+    build_url = build_url or (lambda url: url)
+    processed = name and is_processed(name)
+    original = build_url(default_storage.url(name)) if name else None
+    return {
+        size: {
+            extension: (
+                build_url(default_storage.url(
+                    derived_name(name, size, extension)
+                )) if processed else original
+            )
+            for extension in IMAGE_FORMATS
+        }
+        for size in IMAGE_SIZES
+    }
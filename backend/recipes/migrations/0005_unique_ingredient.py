@@ -0,0 +1,64 @@
+# Generated by Django 3.2.15 on 2026-10-17 06:13
+
+from itertools import groupby
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_rows(model, owner, amount, keep, extra):
+    rows = model.objects.filter(
+        ingredient_id__in=[keep, *extra]
+    ).order_by(owner, 'ingredient_id')
+    for _, group in groupby(rows, key=lambda row: getattr(row, owner)):
+        survivor, *others = group
+        if not others and survivor.ingredient_id == keep:
+            continue
+        setattr(survivor, amount, sum(
+            getattr(row, amount) for row in (survivor, *others)
+        ))
+        survivor.ingredient_id = keep
+        model.objects.filter(pk__in=[row.pk for row in others]).delete()
+        survivor.save(update_fields=['ingredient', amount])
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Сливаем одинаковые ингредиенты в тот, что с меньшим id: строки
+    рецептов и сводных списков покупок переносим на него, количества
+    в одном рецепте или списке складываем.
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingIngredient = apps.get_model('recipes', 'ShoppingIngredient')
+    duplicates = (
+        Ingredient.objects.values('name', 'measurement_unit')
+        .annotate(total=Count('pk'), keep=Min('pk'))
+        .filter(total__gt=1)
+    )
+    for group in list(duplicates):
+        extra = list(
+            Ingredient.objects.filter(
+                name=group['name'], measurement_unit=group['measurement_unit']
+            ).exclude(pk=group['keep']).values_list('pk', flat=True)
+        )
+        merge_rows(RecipeIngredient, 'recipe_id', 'amount',
+                   group['keep'], extra)
+        merge_rows(ShoppingIngredient, 'user_id', 'total_amount',
+                   group['keep'], extra)
+        Ingredient.objects.filter(pk__in=extra).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredient_name_trgm'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
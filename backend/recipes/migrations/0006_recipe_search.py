@@ -0,0 +1,62 @@
+# Generated by Django 3.2.15 on 2026-10-17 06:23
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_CONFIG = 'russian'
+SEARCH_INDEX = 'recipes_recipe_search_vector'
+SEARCH_TRIGGER = 'recipes_recipe_search_vector_update'
+
+POSTGRESQL_FORWARD = (
+    f'''
+    CREATE FUNCTION {SEARCH_TRIGGER}() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('{SEARCH_CONFIG}',
+                                  coalesce(NEW.name, '')), 'A')
+            || setweight(to_tsvector('{SEARCH_CONFIG}',
+                                     coalesce(NEW.text, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    f'''
+    CREATE TRIGGER {SEARCH_TRIGGER} BEFORE INSERT OR UPDATE
+    ON recipes_recipe FOR EACH ROW EXECUTE PROCEDURE {SEARCH_TRIGGER}()
+    ''',
+    'UPDATE recipes_recipe SET name = name',
+    f'CREATE INDEX {SEARCH_INDEX} ON recipes_recipe '
+    f'USING gin (search_vector)',
+)
+POSTGRESQL_BACKWARD = (
+    f'DROP INDEX IF EXISTS {SEARCH_INDEX}',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TRIGGER} ON recipes_recipe',
+    f'DROP FUNCTION IF EXISTS {SEARCH_TRIGGER}()',
+)
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(
+            run(POSTGRESQL_FORWARD), run(POSTGRESQL_BACKWARD)
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.15 on 2026-10-17 06:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Сколько последних рецептов автора попадает в ленту существующих подписок.
+BACKFILL_SIZE = 100
+
+
+def fill_timelines(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Timeline = apps.get_model('recipes', 'Timeline')
+    Subscribe = apps.get_model('users', 'Subscribe')
+    for follow in Subscribe.objects.order_by('pk').iterator():
+        recipe_ids = Recipe.objects.filter(
+            author_id=follow.author_id
+        ).order_by('-id').values_list('id', flat=True)[:BACKFILL_SIZE]
+        Timeline.objects.bulk_create(
+            [Timeline(user_id=follow.user_id, recipe_id=recipe_id)
+             for recipe_id in recipe_ids],
+            ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0002_counters'),
+        ('recipes', '0007_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Timeline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timelines', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Читатель ленты')),
+            ],
+            options={
+                'verbose_name': 'Рецепт в ленте',
+                'verbose_name_plural': 'Ленты подписок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='timeline',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_timeline_recipe'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
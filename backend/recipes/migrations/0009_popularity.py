@@ -0,0 +1,42 @@
+# Generated by Django 3.2.15 on 2026-10-17 06:36
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def before_window():
+    # Время существующих событий неизвестно: ставим его за окном
+    # популярности, чтобы старая история не считалась свежей.
+    return timezone.now() - timedelta(
+        days=settings.POPULARITY_WINDOW_DAYS + 1
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=before_window, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='popularity',
+            field=models.FloatField(db_index=True, default=0, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AddField(
+            model_name='shopping',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=before_window, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.15 on 2026-10-17 06:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_not_fanned_out(apps, schema_editor):
+    # Рецепты авторов, у которых сейчас слишком много подписчиков,
+    # раскладывались не во все ленты: их берёт ветка чтения.
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.filter(
+        author__subscribers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).update(fanned_out=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_similar_recipes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='fanned_out',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Разложен по лентам'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['author'], name='recipe_not_fanned_out'),
+        ),
+        migrations.RunPython(mark_not_fanned_out, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core import validators
 from django.db import models
 
+from users.models import CounterModel
+
 User = get_user_model()
 
 
@@ -44,12 +47,16 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'measurement_unit'],
+                                    name='unique_ingredient')
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(CounterModel):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -74,6 +81,35 @@ class Recipe(models.Model):
             1, message='Минимальное время приготовления 1 минута'),
         )
     )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
+    favorites_count = models.IntegerField(
+        'Добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    popularity = models.FloatField(
+        'Популярность',
+        default=0,
+        db_index=True,
+        editable=False
+    )
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
+    similar_updated = models.DateTimeField(
+        'Дата подбора похожих',
+        null=True,
+        editable=False
+    )
+    fanned_out = models.BooleanField(
+        'Разложен по лентам',
+        default=True,
+        editable=False
+    )
+
+    counter_fields = ('favorites_count', 'popularity')
 
     class Meta:
         ordering = ['-id']
@@ -83,6 +119,11 @@ class Recipe(models.Model):
             models.UniqueConstraint(fields=['author', 'name'],
                                     name='unique_author_name')
         ]
+        indexes = [
+            models.Index(fields=['author'],
+                         condition=models.Q(fanned_out=False),
+                         name='recipe_not_fanned_out')
+        ]
 
     def __str__(self):
         return self.name
@@ -132,6 +173,11 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name='Рецепт из списка избранного'
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Избранное'
@@ -158,6 +204,11 @@ class Shopping(models.Model):
         related_name='cart',
         verbose_name='Список покупок'
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Список покупок'
@@ -169,3 +220,83 @@ class Shopping(models.Model):
 
     def __str__(self):
         return f'Рецепт {self.recipe} в списке покупок у {self.user}'
+
+
+class ShoppingIngredient(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_ingredients',
+        verbose_name='Автор списка покупок'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_totals',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.IntegerField('Общее количество', default=0)
+
+    class Meta:
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списков покупок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='unique_shopping_ingredient')
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} в списке покупок у {self.user}'
+
+
+class Timeline(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель ленты'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timelines',
+        verbose_name='Рецепт'
+    )
+
+    class Meta:
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_timeline_recipe')
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте у {self.user}'
+
+
+class SimilarRecipe(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'similar'],
+                                    name='unique_similar_recipe')
+        ]
+
+    def __str__(self):
+        return f'{self.similar} похож на {self.recipe}'
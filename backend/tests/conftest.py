@@ -0,0 +1,103 @@
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.cache import local_catalogues, local_versions
+from recipes.models import Ingredient, Tag
+from users.models import CustomUser
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAA'
+    'DElEQVR4nGP4z8AAAAMBAQDJ/pLvAAAAAElFTkSuQmCC'
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    cache.clear()
+    local_catalogues.clear()
+    local_versions.clear()
+
+
+@pytest.fixture
+def users(db):
+    return [
+        CustomUser.objects.create_user(
+            username=f'user{number}', email=f'user{number}@foodgram.ru',
+            password='password', first_name='Имя', last_name='Фамилия'
+        )
+        for number in range(4)
+    ]
+
+
+@pytest.fixture
+def site_admin(db):
+    admin = CustomUser.objects.create_superuser(
+        username='admin', email='admin@foodgram.ru', password='password'
+    )
+    client = Client()
+    client.force_login(admin)
+    return client
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=name, color=color, slug=slug)
+        for name, color, slug in (
+            ('Завтрак', '#E26C2D', 'breakfast'),
+            ('Обед', '#49B64E', 'lunch'),
+        )
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    return [
+        Ingredient.objects.create(name=name, measurement_unit=unit)
+        for name, unit in (
+            ('Мука', 'г'), ('Молоко', 'мл'), ('Яйцо', 'шт'), ('Соль', 'г')
+        )
+    ]
+
+
+@pytest.fixture
+def make_client():
+    def make(user):
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+    return make
+
+
+@pytest.fixture
+def recipe_data(tags, ingredients):
+    def data(name, amounts, recipe_tags=None):
+        return {
+            'name': name,
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': IMAGE,
+            'tags': [tag.id for tag in recipe_tags or tags],
+            'ingredients': [
+                {'id': ingredients[index].id, 'amount': amount}
+                for index, amount in amounts
+            ],
+        }
+    return data
+
+
+@pytest.fixture
+def make_recipe(make_client, recipe_data):
+    def make(author, name, amounts, recipe_tags=None):
+        response = make_client(author).post(
+            '/api/recipes/', recipe_data(name, amounts, recipe_tags),
+            format='json'
+        )
+        assert response.status_code == 201, response.data
+        return response.data['id']
+    return make
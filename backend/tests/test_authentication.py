@@ -0,0 +1,89 @@
+import pickle
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from api.authentication import TokenCache, token_cache, token_key
+from users.models import CustomUser
+
+
+@pytest.fixture(autouse=True)
+def local_tokens(settings):
+    settings.TOKEN_CACHE_LOCAL_TTL = 60
+    token_cache.entries.clear()
+    yield
+    token_cache.entries.clear()
+
+
+@pytest.fixture
+def client(users, make_client):
+    client = make_client(users[0])
+    assert client.get('/api/users/me/').status_code == 200
+    return client
+
+
+def token_of(user):
+    return Token.objects.get(user=user).key
+
+
+@pytest.mark.django_db
+def test_cache_holds_only_user_id(client, users):
+    user_id, cached_at = cache.get(token_key(token_of(users[0])))
+    assert user_id == users[0].pk
+    assert isinstance(cached_at, float)
+    assert b'pbkdf2' not in pickle.dumps(dict(token_cache.entries))
+
+
+@pytest.mark.django_db
+def test_warm_hit_skips_token_table(client):
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get('/api/users/me/').status_code == 200
+    assert not any('authtoken_token' in query['sql']
+                   for query in queries.captured_queries)
+
+
+@pytest.mark.django_db
+def test_logout_revokes_immediately(client,
+                                    django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client.post('/api/auth/token/logout/').status_code == 204
+    assert client.get('/api/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_revocation_in_other_worker_is_seen(client, users):
+    key = token_of(users[0])
+    assert key in token_cache.entries
+    TokenCache().evict(key)
+    Token.objects.filter(key=key).delete()
+    assert client.get('/api/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_stale_entry_after_revocation_is_ignored(client, users):
+    key = token_of(users[0])
+    user_id, cached_at = token_cache.entries[key][1:]
+    TokenCache().evict(key)
+    Token.objects.filter(key=key).delete()
+    token_cache.set(key, user_id, cached_at)
+    assert client.get('/api/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_user_change_is_seen_without_eviction(client, users):
+    CustomUser.objects.filter(pk=users[0].pk).update(first_name='Другое')
+    assert client.get('/api/users/me/').data['first_name'] == 'Другое'
+    CustomUser.objects.filter(pk=users[0].pk).update(is_active=False)
+    assert client.get('/api/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_user_save_re_reads_token(client, users,
+                                  django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        users[0].save()
+    assert client.get('/api/users/me/').status_code == 200
+    assert client.get('/api/users/me/').status_code == 200
@@ -0,0 +1,159 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from recipes.models import Recipe, RecipeIngredient, ShoppingIngredient
+from users.models import CustomUser
+
+
+def assert_consistent():
+    """Сводные списки покупок и счётчики совпадают с таблицами."""
+    call_command('shopping_totals', check=True, stdout=StringIO())
+    call_command('reconcile_counters', check=True, stdout=StringIO())
+
+
+@pytest.mark.django_db
+def test_single_add_and_remove(users, make_client, make_recipe):
+    author, reader = users[:2]
+    first = make_recipe(author, 'Блины', [(0, 200), (1, 300)])
+    second = make_recipe(author, 'Омлет', [(1, 100), (2, 3)])
+    client = make_client(reader)
+    for recipe_id in (first, second):
+        for url in ('favorite', 'shopping_cart'):
+            response = client.post(f'/api/recipes/{recipe_id}/{url}/')
+            assert response.status_code == 201
+    assert_consistent()
+    assert ShoppingIngredient.objects.get(
+        user=reader, ingredient__name='Молоко'
+    ).total_amount == 400
+
+    for url in ('favorite', 'shopping_cart'):
+        response = client.delete(f'/api/recipes/{first}/{url}/')
+        assert response.status_code == 204
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_recipe_update_and_delete(users, make_client, make_recipe,
+                                  recipe_data):
+    author, reader = users[:2]
+    recipe_id = make_recipe(author, 'Блины', [(0, 200), (1, 300)])
+    client = make_client(reader)
+    client.post(f'/api/recipes/{recipe_id}/favorite/')
+    client.post(f'/api/recipes/{recipe_id}/shopping_cart/')
+
+    response = make_client(author).patch(
+        f'/api/recipes/{recipe_id}/',
+        recipe_data('Блины', [(1, 500), (3, 5)]), format='json'
+    )
+    assert response.status_code == 200
+    assert_consistent()
+
+    response = make_client(author).delete(f'/api/recipes/{recipe_id}/')
+    assert response.status_code == 204
+    assert not ShoppingIngredient.objects.filter(user=reader).exists()
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_batch_add_and_remove(users, make_client, make_recipe):
+    author, reader = users[:2]
+    recipe_ids = [
+        make_recipe(author, f'Рецепт {number}', [(number % 4, 10)])
+        for number in range(4)
+    ]
+    client = make_client(reader)
+    for url in ('favorite', 'shopping_cart'):
+        response = client.post(
+            f'/api/recipes/{url}/', {'recipes': recipe_ids}, format='json'
+        )
+        assert response.status_code == 200
+    assert_consistent()
+
+    for url in ('favorite', 'shopping_cart'):
+        response = client.delete(
+            f'/api/recipes/{url}/', {'recipes': recipe_ids[:2]},
+            format='json'
+        )
+        assert response.status_code == 200
+    assert_consistent()
+
+    response = client.delete('/api/recipes/shopping_cart/')
+    assert response.status_code == 200
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_subscriptions_and_user_delete(users, make_client, make_recipe):
+    author, first, second = users[:3]
+    recipe_id = make_recipe(author, 'Блины', [(0, 200)])
+    own_recipe = make_recipe(first, 'Омлет', [(1, 100)])
+    for user in (first, second):
+        client = make_client(user)
+        assert client.post(
+            f'/api/users/{author.id}/subscribe/'
+        ).status_code == 201
+        client.post(f'/api/recipes/{recipe_id}/favorite/')
+        client.post(f'/api/recipes/{recipe_id}/shopping_cart/')
+    make_client(second).post(f'/api/recipes/{own_recipe}/shopping_cart/')
+    assert_consistent()
+
+    assert make_client(second).delete(
+        f'/api/users/{author.id}/subscribe/'
+    ).status_code == 204
+    assert_consistent()
+
+    CustomUser.objects.get(pk=first.pk).delete()
+    assert not Recipe.objects.filter(pk=own_recipe).exists()
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_checks_report_drift(users, make_recipe):
+    recipe_id = make_recipe(users[0], 'Блины', [(0, 200)])
+    Recipe.objects.filter(pk=recipe_id).update(favorites_count=5)
+    with pytest.raises(CommandError):
+        call_command('reconcile_counters', check=True, stdout=StringIO())
+
+
+@pytest.mark.django_db
+def test_recipe_created_outside_api(users):
+    recipe = Recipe.objects.create(
+        author=users[0], name='Каша', text='Описание', cooking_time=5,
+        image='recipe_img/porridge.png'
+    )
+    assert CustomUser.objects.get(pk=users[0].pk).recipes_count == 1
+    assert_consistent()
+
+    recipe.delete()
+    assert CustomUser.objects.get(pk=users[0].pk).recipes_count == 0
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_recipe_ingredient_admin(users, make_client, make_recipe,
+                                 site_admin):
+    recipe_id = make_recipe(users[0], 'Блины', [(0, 200), (1, 300)])
+    make_client(users[1]).post(f'/api/recipes/{recipe_id}/shopping_cart/')
+    row = RecipeIngredient.objects.filter(recipe_id=recipe_id).first()
+    url = f'/admin/recipes/recipeingredient/{row.pk}'
+    assert site_admin.post(
+        f'{url}/change/', {'amount': 1}
+    ).status_code == 403
+    assert site_admin.get(
+        '/admin/recipes/recipeingredient/add/'
+    ).status_code == 403
+
+    response = site_admin.post(f'{url}/delete/', {'post': 'yes'})
+    assert response.status_code == 302
+    assert not RecipeIngredient.objects.filter(pk=row.pk).exists()
+    assert_consistent()
+
+    response = site_admin.post(
+        f'/admin/recipes/recipe/{recipe_id}/delete/', {'post': 'yes'}
+    )
+    assert response.status_code == 302
+    assert not ShoppingIngredient.objects.exists()
+    assert_consistent()
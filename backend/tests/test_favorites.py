@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, Recipe, Shopping
+
+ENDPOINTS = (
+    ('favorite', Favorite),
+    ('shopping_cart', Shopping),
+)
+
+
+@pytest.fixture
+def recipe_id(users, make_recipe):
+    return make_recipe(users[0], 'Блины', [(0, 200), (1, 500)])
+
+
+def table_queries(queries, model):
+    table = model._meta.db_table
+    return [query['sql'] for query in queries.captured_queries
+            if f'"{table}"' in query['sql']]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('endpoint, model', ENDPOINTS)
+def test_add_and_remove_in_one_statement(recipe_id, users, make_client,
+                                         endpoint, model):
+    client = make_client(users[1])
+    url = f'/api/recipes/{recipe_id}/{endpoint}/'
+    with CaptureQueriesContext(connection) as added:
+        assert client.post(url).status_code == 201
+    [insert] = table_queries(added, model)
+    assert insert.startswith('INSERT') and 'ON CONFLICT DO NOTHING' in insert
+    with CaptureQueriesContext(connection) as removed:
+        assert client.delete(url).status_code == 204
+    [delete] = table_queries(removed, model)
+    assert delete.startswith('DELETE') and 'RETURNING' in delete
+    assert not model.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('endpoint, model', ENDPOINTS)
+def test_repeated_add_and_remove(recipe_id, users, make_client,
+                                 endpoint, model):
+    client = make_client(users[1])
+    url = f'/api/recipes/{recipe_id}/{endpoint}/'
+    assert client.post(url).status_code == 201
+    assert client.post(url).status_code == 400
+    assert model.objects.filter(user=users[1]).count() == 1
+    assert client.delete(url).status_code == 204
+    assert client.delete(url).status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('endpoint, model', ENDPOINTS)
+def test_missing_recipe(users, make_client, endpoint, model):
+    client = make_client(users[1])
+    assert client.post(f'/api/recipes/999/{endpoint}/').status_code == 404
+    assert client.delete(f'/api/recipes/999/{endpoint}/').status_code == 404
+    assert not model.objects.exists()
+
+
+@pytest.mark.skipif(
+    connection.vendor == 'sqlite',
+    reason='SQLite не пускает две пишущие транзакции одновременно'
+)
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('endpoint, model', ENDPOINTS)
+def test_concurrent_double_add(recipe_id, users, make_client,
+                               endpoint, model):
+    url = f'/api/recipes/{recipe_id}/{endpoint}/'
+    clients = [make_client(users[1]) for _ in range(2)]
+    barrier = threading.Barrier(len(clients))
+    statuses = []
+
+    def add(client):
+        barrier.wait()
+        try:
+            statuses.append(client.post(url).status_code)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=add, args=(client,))
+               for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(statuses) == [201, 400]
+    assert model.objects.filter(user=users[1]).count() == 1
+    if model is Favorite:
+        assert Recipe.objects.get(pk=recipe_id).favorites_count == 1
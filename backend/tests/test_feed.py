@@ -0,0 +1,44 @@
+import pytest
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Timeline
+
+
+@pytest.fixture
+def follower(users, make_client):
+    author, reader = users[:2]
+    response = make_client(reader).post(f'/api/users/{author.id}/subscribe/')
+    assert response.status_code == 201
+    return reader
+
+
+def feed_ids(client):
+    response = client.get('/api/recipes/feed/', {'limit': 50})
+    assert response.status_code == 200, response.data
+    return [recipe['id'] for recipe in response.data['results']]
+
+
+@pytest.mark.django_db
+def test_api_recipe_is_fanned_out(users, follower, make_client, make_recipe,
+                                  django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe_id = make_recipe(users[0], 'Каша', [(0, 100)])
+    assert Timeline.objects.filter(user=follower, recipe_id=recipe_id).exists()
+    assert feed_ids(make_client(follower)) == [recipe_id]
+
+
+@pytest.mark.django_db
+def test_orm_recipe_is_fanned_out(users, follower, make_client,
+                                  django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe = Recipe.objects.create(
+            author=users[0], name='Каша', text='Описание', cooking_time=5,
+            image='recipe_img/porridge.png'
+        )
+    assert Timeline.objects.filter(user=follower, recipe=recipe).exists()
+    assert feed_ids(make_client(follower)) == [recipe.pk]
+
+
+@pytest.mark.django_db
+def test_feed_requires_authentication():
+    assert APIClient().get('/api/recipes/feed/').status_code == 401
@@ -0,0 +1,68 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Tag
+
+
+@pytest.fixture
+def tagged(users, tags, make_recipe):
+    breakfast, lunch = tags
+    return {
+        'breakfast': make_recipe(users[0], 'Каша', [(0, 100)], [breakfast]),
+        'lunch': make_recipe(users[0], 'Суп', [(1, 300)], [lunch]),
+        'both': make_recipe(users[0], 'Блины', [(2, 2)], [breakfast, lunch]),
+    }
+
+
+def recipe_ids(response):
+    assert response.status_code == 200, response.data
+    return {recipe['id'] for recipe in response.data['results']}
+
+
+@pytest.mark.django_db
+def test_tags_match_any(tagged):
+    client = APIClient()
+    assert recipe_ids(
+        client.get('/api/recipes/', {'tags': 'breakfast'})
+    ) == {tagged['breakfast'], tagged['both']}
+    assert recipe_ids(
+        client.get('/api/recipes/', {'tags': ['breakfast', 'lunch']})
+    ) == set(tagged.values())
+
+
+@pytest.mark.django_db
+def test_tags_all_match_every_tag(tagged):
+    response = APIClient().get(
+        '/api/recipes/', {'tags': ['breakfast', 'lunch'], 'tags_all': True}
+    )
+    assert recipe_ids(response) == {tagged['both']}
+
+
+@pytest.mark.django_db
+def test_unknown_tag_is_rejected(tagged):
+    response = APIClient().get('/api/recipes/', {'tags': 'dinner'})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_new_tag_is_accepted(tagged, users, make_recipe):
+    dinner = Tag.objects.create(name='Ужин', color='#8775D2', slug='dinner')
+    recipe_id = make_recipe(users[1], 'Рагу', [(3, 5)], [dinner])
+    assert recipe_ids(
+        APIClient().get('/api/recipes/', {'tags': 'dinner'})
+    ) == {recipe_id}
+
+
+@pytest.mark.django_db
+def test_warm_tag_filter_skips_catalogue_queries(tagged):
+    client = APIClient()
+    client.get('/api/recipes/', {'tags': 'breakfast'})
+    with CaptureQueriesContext(connection) as plain:
+        recipe_ids(client.get('/api/recipes/'))
+    with CaptureQueriesContext(connection) as filtered:
+        recipe_ids(client.get('/api/recipes/', {'tags': 'lunch'}))
+    assert len(filtered) == len(plain)
+    assert not any('api_cacheversion' in query['sql']
+                   for query in filtered.captured_queries)
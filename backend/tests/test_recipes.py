@@ -0,0 +1,119 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def listed(users, tags, make_recipe, make_client):
+    breakfast, lunch = tags
+    recipes = [
+        make_recipe(users[0], 'Каша', [(0, 100)], [breakfast]),
+        make_recipe(users[1], 'Суп', [(1, 300)], [lunch]),
+        make_recipe(users[1], 'Блины', [(2, 2)], [breakfast, lunch]),
+    ]
+    client = make_client(users[2])
+    for recipe_id in recipes[1:]:
+        client.post(f'/api/recipes/{recipe_id}/favorite/')
+    return recipes
+
+
+def count_queries(queries):
+    return [query['sql'] for query in queries.captured_queries
+            if 'COUNT(' in query['sql']]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params, expected', (
+    ({}, 3),
+    ({'is_favorited': 1}, 2),
+    ({'is_favorited': 1, 'tags': 'breakfast'}, 1),
+    ({'search': 'суп'}, 1),
+))
+def test_page_count_skips_annotations(listed, users, make_client,
+                                      params, expected):
+    client = make_client(users[2])
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get('/api/recipes/', params)
+    assert response.status_code == 200, response.data
+    assert response.data['count'] == expected
+    assert len(response.data['results']) == expected
+    [count] = count_queries(queries)
+    assert 'FROM (SELECT' not in count
+    assert 'recipes_shopping' not in count
+    assert 'users_subscribe' not in count
+
+
+@pytest.mark.django_db
+def test_recipe_update_with_deferred_search_vector(listed, users,
+                                                   make_client, recipe_data):
+    client = make_client(users[0])
+    response = client.patch(
+        f'/api/recipes/{listed[0]}/', recipe_data('Овсянка', [(0, 50)]),
+        format='json'
+    )
+    assert response.status_code == 200, response.data
+    assert client.get(
+        '/api/recipes/', {'search': 'овсянка'}
+    ).data['count'] == 1
+
+
+@pytest.fixture
+def catalogue(users, tags, make_recipe, make_client):
+    breakfast, lunch = tags
+    recipes = [
+        make_recipe(users[index % 2], f'Рецепт {index}', [(index % 4, 10)],
+                    [(breakfast, lunch)[index % 2]] if index % 3 else tags)
+        for index in range(9)
+    ]
+    client = make_client(users[2])
+    for recipe_id in recipes[::2]:
+        client.post(f'/api/recipes/{recipe_id}/favorite/')
+    for recipe_id in recipes[::3]:
+        client.post(f'/api/recipes/{recipe_id}/shopping_cart/')
+    return recipes
+
+
+def walk_cursor(client, params):
+    ids = []
+    response = client.get('/api/recipes/', {**params, 'cursor': '',
+                                            'limit': 2})
+    while True:
+        assert response.status_code == 200, response.data
+        assert 'count' not in response.data
+        ids.extend(recipe['id'] for recipe in response.data['results'])
+        if response.data['next'] is None:
+            return ids
+        response = client.get(response.data['next'])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', (
+    {},
+    {'tags': 'breakfast'},
+    {'tags': ['breakfast', 'lunch'], 'tags_all': True},
+    {'author': 0},
+    {'is_favorited': 1},
+    {'is_in_shopping_cart': 1, 'tags': 'lunch'},
+    {'is_favorited': 1, 'is_in_shopping_cart': 1, 'author': 0},
+))
+def test_cursor_pages_match_page_numbers(catalogue, users, make_client,
+                                         params):
+    client = make_client(users[2])
+    if 'author' in params:
+        params = {**params, 'author': users[params['author']].pk}
+    expected = client.get('/api/recipes/', {**params, 'limit': 100})
+    assert expected.status_code == 200, expected.data
+    expected_ids = [recipe['id'] for recipe in expected.data['results']]
+    assert expected_ids
+    with CaptureQueriesContext(connection) as queries:
+        assert walk_cursor(client, params) == expected_ids
+    assert not count_queries(queries)
+
+
+@pytest.mark.django_db
+def test_search_keeps_page_numbers(catalogue, users, make_client):
+    response = make_client(users[2]).get(
+        '/api/recipes/', {'search': 'рецепт', 'cursor': '', 'limit': 2}
+    )
+    assert response.status_code == 200, response.data
+    assert response.data['count'] == len(catalogue)
@@ -0,0 +1,97 @@
+from contextlib import ExitStack
+
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.replicas import PIN_COOKIE, replica_pool
+
+REPLICAS = ('replica1', 'replica2')
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = list(REPLICAS)
+    for alias in REPLICAS:
+        connections.databases[alias] = dict(
+            connections['default'].settings_dict
+        )
+    replica_pool.down_until.clear()
+    yield
+    for alias in REPLICAS:
+        connections[alias].close()
+        del connections[alias]
+        del connections.databases[alias]
+    replica_pool.down_until.clear()
+
+
+def recipe_reads(queries):
+    return [query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            and '"recipes_recipe"' in query['sql']]
+
+
+def reads_by_alias(client, path, aliases=('default', *REPLICAS)):
+    captured = {}
+    with ExitStack() as stack:
+        contexts = [
+            stack.enter_context(CaptureQueriesContext(connections[alias]))
+            for alias in aliases
+        ]
+        response = client.get(path)
+    assert response.status_code == 200, response.data
+    for context in contexts:
+        reads = recipe_reads(context)
+        if reads:
+            captured[context.connection.alias] = reads
+    return captured
+
+
+@pytest.mark.django_db(transaction=True)
+def test_request_reads_from_one_replica(replicas, users, make_recipe):
+    make_recipe(users[0], 'Каша', [(0, 100)])
+    client = APIClient()
+    first = reads_by_alias(client, '/api/recipes/')
+    second = reads_by_alias(client, '/api/recipes/')
+    assert len(first) == len(second) == 1
+    assert {*first, *second} == set(REPLICAS)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_write_pins_client_to_primary(replicas, users, make_client,
+                                      recipe_data):
+    client = make_client(users[0])
+    response = client.post(
+        '/api/recipes/', recipe_data('Каша', [(0, 100)]), format='json'
+    )
+    assert response.status_code == 201, response.data
+    assert response.cookies[PIN_COOKIE]['max-age'] > 0
+    assert set(reads_by_alias(client, '/api/recipes/')) == {'default'}
+    del client.cookies[PIN_COOKIE]
+    assert set(reads_by_alias(client, '/api/recipes/')) <= set(REPLICAS)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_write_does_not_pin(replicas, users, make_client):
+    response = make_client(users[0]).post(
+        '/api/recipes/', {}, format='json'
+    )
+    assert response.status_code == 400
+    assert PIN_COOKIE not in response.cookies
+
+
+@pytest.mark.django_db(transaction=True)
+def test_unreachable_replica_falls_back(replicas, users, make_recipe,
+                                        tmp_path):
+    make_recipe(users[0], 'Каша', [(0, 100)])
+    for alias in REPLICAS:
+        connections[alias].settings_dict['NAME'] = str(
+            tmp_path / 'missing' / f'{alias}.db'
+        )
+    client = APIClient()
+    for _ in REPLICAS:
+        assert set(
+            reads_by_alias(client, '/api/recipes/', aliases=('default',))
+        ) == {'default'}
+    assert replica_pool.choose() is None
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from api.streaming import AsyncStreamingHttpResponse
+from api.utils import ShoppingCartRows, shopping_cart_csv
+from recipes.models import Ingredient
+
+EXPECTED = [
+    ('Молоко', 'мл', 300),
+    ('Мука', 'г', 200),
+    ('Соль', 'г', 5),
+    ('Соль', 'кг', 2),
+    ('Яйцо', 'шт', 3),
+]
+
+
+@pytest.fixture
+def cart(users, ingredients, make_client, make_recipe):
+    ingredients.append(
+        Ingredient.objects.create(name='Соль', measurement_unit='кг')
+    )
+    recipe_ids = [
+        make_recipe(users[0], 'Блины', [(0, 200), (1, 300), (2, 3), (3, 5)]),
+        make_recipe(users[0], 'Рассол', [(4, 2)]),
+    ]
+    response = make_client(users[1]).post(
+        '/api/recipes/shopping_cart/', {'recipes': recipe_ids}, format='json'
+    )
+    assert response.status_code == 200
+    return users[1]
+
+
+@pytest.mark.django_db
+def test_rows_are_read_by_key_pages(cart):
+    for page_size in (1, 2, 5, None):
+        assert list(ShoppingCartRows(cart, page_size)) == EXPECTED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rows_stream_with_async_for(cart):
+    async def read():
+        response = AsyncStreamingHttpResponse(
+            shopping_cart_csv(ShoppingCartRows(cart, page_size=2))
+        )
+        return b''.join([part async for part in response]).decode()
+
+    lines = asyncio.run(read()).splitlines()
+    assert lines[0] == 'Ингредиент,Единица измерения,Количество'
+    assert lines[1:] == [','.join(map(str, row)) for row in EXPECTED]
+
+
+@pytest.mark.django_db
+def test_download_formats(cart, make_client):
+    client = make_client(cart)
+    response = client.get('/api/recipes/download_shopping_cart/',
+                          HTTP_ACCEPT='text/plain')
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content).decode().splitlines() == [
+        f'{name} {unit} - {amount}' for name, unit, amount in EXPECTED
+    ]
+    response = client.get('/api/recipes/download_shopping_cart/',
+                          HTTP_ACCEPT='application/pdf')
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content).startswith(b'%PDF')
@@ -1,3 +1,4 @@
+from api.utils import unsubscribe
 from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
@@ -13,7 +14,9 @@ class CustomUserAdmin(UserAdmin):
         'username',
         'email',
         'first_name',
-        'last_name'
+        'last_name',
+        'recipes_count',
+        'subscribers_count'
     )
     search_fields = (
         'username',
@@ -32,6 +35,21 @@ class SubscribeAdmin(admin.ModelAdmin):
     list_filter = ('user', 'author')
     empty_value_display = settings.EMPTY_VALUE_DISPLAY
 
+    # Подписки добавляются только через API, а удаляются через
+    # unsubscribe: вместе с ними меняются счётчик подписчиков и ленты.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_model(self, request, obj):
+        unsubscribe(obj.user, obj.author)
+
+    def delete_queryset(self, request, queryset):
+        for follow in queryset.select_related('user', 'author'):
+            unsubscribe(follow.user, follow.author)
+
 
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(Subscribe, SubscribeAdmin)
@@ -1,6 +1,9 @@
+from api.feed import backfill
 from api.pagination import CustomPageNumberPagination
 from api.serializers import FollowSerializer
+from api.utils import attach_recent_recipes, unsubscribe, update_counter
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
@@ -21,6 +24,7 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=[IsAuthenticated],
         methods=['POST', 'DELETE']
     )
+    @transaction.atomic
     def subscribe(self, request, id=None):
         user = request.user
         author = get_object_or_404(User, id=id)
@@ -36,13 +40,14 @@ class CustomUserViewSet(UserViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             follow = Subscribe.objects.create(user=user, author=author)
+            update_counter(User.objects.filter(pk=author.pk),
+                           'subscribers_count', 1)
+            backfill(user, author)
             serializer = FollowSerializer(
                 follow, context={'request': request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        if Subscribe.objects.filter(user=user, author=author).exists():
-            follow = get_object_or_404(Subscribe, user=user, author=author)
-            follow.delete()
+        if unsubscribe(user, author):
             return Response(
                 'Подписка успешно удалена',
                 status=status.HTTP_204_NO_CONTENT
@@ -64,8 +69,15 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = Subscribe.objects.filter(user=user)
-        pages = self.paginate_queryset(queryset)
+        queryset = (
+            Subscribe.objects.filter(user=user)
+            .select_related('author')
+            .order_by('id')
+        )
+        pages = attach_recent_recipes(
+            self.paginate_queryset(queryset),
+            request.query_params.get('recipes_limit')
+        )
         serializer = FollowSerializer(
             pages,
             many=True,